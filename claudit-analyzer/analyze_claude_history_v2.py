@@ -6,24 +6,56 @@ or to identify behavioral rules for improvement.
 
 import threading
 import argparse
+import copy
+import functools
+import hashlib
+import itertools
 import json
+import math
+import multiprocessing
 import os
+import queue
+import random
+import re
+import select
 import sys
 import subprocess
 import shutil
+import signal
+import sqlite3
 import time
 from abc import ABC, abstractmethod
-from datetime import datetime
+from contextlib import closing, contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, as_completed, FIRST_COMPLETED, ALL_COMPLETED
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
+import openai
 from openai import OpenAI
 from tqdm import tqdm
 import tiktoken
-from rich.console import Console
+from rich.console import Console, Group
+from rich.live import Live
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.panel import Panel
 
+# Optional faster JSON codecs for ingestion; the stdlib json module is used without them
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+# Payload files are locked between processes where flock exists (not on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Constants
 CLAUDE_PROJECTS_DIR = Path.home() / ".claude" / "projects"
 GEMINI_MODEL = "gemini-2.5-flash"
@@ -31,7 +63,14 @@ GEMINI_MODEL = "gemini-2.5-flash"
 # Constants for retry mechanism
 MAX_RETRIES = 5
 INITIAL_BACKOFF_SECONDS = 5
-GEMINI_CLI_TIMEOUT = 120  # seconds - increased to account for directory scanning overhead
+MAX_BACKOFF_SECONDS = 60
+# A server asking us to wait longer than this is signalling an exhausted quota, not a blip
+MAX_RETRY_AFTER_SECONDS = 300
+# Watchdog limits for a single gemini CLI call: loose enough that a full-budget chunk, which can take
+# minutes, is only killed when it has clearly hung; tighten them from the p99 latency in the run summary
+GEMINI_CLI_TIMEOUT = 600  # seconds - total wall clock, including directory scanning overhead
+GEMINI_CLI_STALL_TIMEOUT = 300  # seconds without any stdout/stderr output
+WATCHDOG_POLL_SECONDS = 1
 
 # Pricing for Gemini 2.5 Flash (July 2025)
 PRICE_PER_M_INPUT = 0.30
@@ -46,9 +85,1149 @@ PLACEHOLDER_IMAGE = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAA
 
 MAX_OUTPUT_TOKENS = 65_535  # Conservative estimate for output
 
+# Context window of each model, in tokens
+MODEL_CONTEXT_TOKENS = {
+    "gemini-2.5-flash": 1_048_576,
+}
+DEFAULT_CONTEXT_TOKENS = 1_000_000
+
+# Tokens per map request (system prompt + chunk + expected output) for each model. A chunk is
+# cut as soon as it fills what is left after reserving room for the prompt and the report.
+REQUEST_TOKEN_BUDGETS = {
+    "gemini-2.5-flash": 300_000,
+}
+DEFAULT_REQUEST_TOKEN_BUDGET = 250_000
+
+# Encoding used for all token counts (GPT-4's; a close enough proxy for Gemini)
+TOKEN_ENCODING = "cl100k_base"
+# Threads tiktoken encodes a batch on (it releases the GIL), and lines counted per batch
+TOKENIZER_THREADS = 8
+TOKENIZE_BATCH_LINES = 512
+
+# Default number of chunks analyzed concurrently
+DEFAULT_JOBS = 4
+
+# Requests and input tokens per minute for each (backend, model); None disables that limit.
+# API figures are the Gemini 2.5 Flash tier 1 quotas, CLI figures the Google login free tier.
+RATE_LIMITS = {
+    ("api", "gemini-2.5-flash"): {"rpm": 1000, "tpm": 1_000_000},
+    ("cli", "gemini-2.5-flash"): {"rpm": 60, "tpm": None},
+}
+DEFAULT_RATE_LIMIT = {"rpm": 60, "tpm": None}
+
+# Rough characters per token, used to charge the token bucket without tokenizing every request
+CHARS_PER_TOKEN = 4
+
+# Most input tokens sent to a single consolidation call; bigger projects are merged as a tree
+CONSOLIDATION_TOKEN_BUDGET = 200_000
+
 METADATA_MARKER = "<!-- Last run:"
-CACHE_MARKER = "<!-- Cache updated:"
-PROJECTS_CACHE_FILE = "projects_cache.json"
+PROJECTS_DB_FILE = "projects.sqlite3"
+SELECT_PROMPT = "[bold]Select a project number (or 'q' to quit):[/bold] "
+PAYLOAD_CACHE_DIR = "payload_cache"
+# Bumped whenever the filtered payload format changes, so cached payloads get rebuilt
+PAYLOAD_VERSION = 5
+# Next to each payload file: the lock held while it is written, and the rebuild written before replacing it
+PAYLOAD_LOCK_SUFFIX = ".lock"
+PAYLOAD_TEMP_SUFFIX = ".tmp"
+
+# Projection profiles: the record paths sent for analysis. A path keeps its whole value;
+# lists are transparent, so "message.content.text" keeps the text of every content block,
+# and a plain string where a nested path was expected (e.g. string message content) is kept.
+PROJECTION_PROFILES = {
+    # What rules analysis needs: the conversation, and which tools were run on what
+    "rules-min": [
+        "type", "timestamp", "summary",
+        "message.role",
+        "message.content.type", "message.content.text",
+        "message.content.name",
+        "message.content.input.command", "message.content.input.description",
+        "message.content.input.file_path", "message.content.input.path", "message.content.input.pattern",
+        "message.content.input.query", "message.content.input.url", "message.content.input.prompt",
+        "message.content.content", "message.content.is_error",
+    ],
+    # Adds reasoning and full tool inputs, for decisions and milestones
+    "knowledge": [
+        "type", "timestamp", "summary",
+        "message.role",
+        "message.content.type", "message.content.text", "message.content.thinking",
+        "message.content.name", "message.content.input",
+        "message.content.content", "message.content.is_error", "message.content.source",
+    ],
+    # Everything the analyzer used to send, including the duplicated toolUseResult
+    "full": ["type", "timestamp", "message", "children", "toolUseResult"],
+}
+DEFAULT_PROFILES = {"rules": "rules-min", "knowledge": "knowledge"}
+# Record types each profile sends (all of them if absent), and the profiles that drop
+# isMeta records (command caveats and other boilerplate injected into the transcript)
+PROFILE_RECORD_TYPES = {
+    "rules-min": {"user", "assistant"},
+    "knowledge": {"user", "assistant", "summary"},
+}
+PROFILES_WITHOUT_META = {"rules-min", "knowledge"}
+# Profiles whose lines are scanned for base64 so the rest skip the binary-payload walk; the
+# others keep so few values that the walk costs less than the scan
+PROFILES_GATING_BINARY = {"full"}
+
+# Strings at least this long made only of base64 characters are treated as binary data, if they
+# are also shaped like base64 (see is_base64_shaped) rather than e.g. a file listing or a rule line
+BASE64_MIN_LENGTH = 1024
+BASE64_PATTERN = re.compile(r'[A-Za-z0-9+/_\-\r\n]+={0,2}\s*')
+# One alphabet, standard or URL-safe, with padding only at the end
+BASE64_BODY_PATTERN = re.compile(r'(?:[A-Za-z0-9+/]+|[A-Za-z0-9_\-]+)={0,2}')
+# Wrapped base64 breaks its lines at a fixed width: 64 (PEM) or 76 (MIME) characters
+BASE64_LINE_WIDTHS = (64, 76)
+# Encoded data mixes upper case, lower case and digits; text made of the same characters rarely does
+BASE64_CHARACTER_CLASSES = (re.compile(r'[A-Z]'), re.compile(r'[a-z]'), re.compile(r'[0-9]'))
+
+# JSON codecs tried for ingestion, fastest first; each must pass a self-check against json
+JSON_CODECS = ("msgspec", "orjson", "json")
+# Floats outside this range print differently in json and the fast codecs (1e-05 vs 0.00001)
+EXACT_FLOAT_RANGE = (1e-4, 1e16)
+# Lines the codec self-check runs through every profile, chosen for the corners where codecs differ
+CODEC_PROBE_LINES = [
+    rb'{"type":"summary","summary":"Caf\u00e9 \u2028 \u00e9t\u00e9 \ud83d\ude00","leafUuid":"x"}',
+    rb'{"parentUuid":null,"type":"user","message":{"role":"user","content":"tab\tnl\nctl\u0001 del\u007f /\\ \"q\""},'
+    rb'"isMeta":false,"timestamp":"2025-07-11T11:51:40.182Z"}',
+    rb'{"type":"assistant","message":{"id":"m","type":"message","role":"assistant","content":[{"type":"text","text":"ok"},'
+    rb'{"type":"tool_use","id":"t","name":"Read","input":{"file_path":"/a.py","limit":100,"offset":0.5,"nested":{"k":[1,2.25,true,null]}}}],'
+    rb'"usage":{"input_tokens":3}},"timestamp":"2025-07-11T11:51:41.000Z"}',
+    rb'{"type":"user","message":{"role":"user","content":[{"type":"tool_result","tool_use_id":"t","is_error":false,'
+    rb'"content":[{"type":"image","source":{"type":"base64","media_type":"image/png","data":"iVBORw0KGgo="}}]}]},'
+    rb'"toolUseResult":{"durationMs":12.5,"tiny":1e-7,"huge":1e300,"big":123456789012345678901234567890}}',
+    rb'{"type":"user","message":{"role":"user","content":"dup"},"message":{"role":"user","content":"last wins"}}',
+    rb'{"type":"user","message":{"role":"user","content":"nan"},"toolUseResult":NaN}',
+    rb'{"type":"user","message":{"role":"user","content":"lone \ud800 surrogate"}}',
+    rb'{"type":"user","isMeta":true,"message":{"role":"user","content":"Caveat"}}',
+    rb'["not", "a", "record"]',
+    rb'{"type":"user","message":',
+] + [
+    # Long strings of base64 characters: wrapped and unwrapped base64 is stripped, text isn't
+    json.dumps({"type": "user", "message": {"role": "user", "content": [{"type": "tool_result", "content": content}]}},
+               separators=(',', ':')).encode()
+    for content in (
+        "\n".join(f"module_{i}" for i in range(120)),
+        "-" * 1200,
+        "aGVsbG8gd29ybGQh" * 80,
+        "\n".join(["QUJDREVGR0hJSktMTU5PUFFSU1RVVldYWVphYmNkZWZnaGlqa2xtbm9wcXJzdHV2d3h5ejAxMjM0"] * 20),
+    )
+]
+
+# Raw-line prefilter: the top-level "type" is sniffed from either end of a line, so records
+# a profile doesn't send are dropped without decoding them
+TYPE_SNIFF_BYTES = 512
+# Claude Code writes compact JSON; lines spaced any other way are simply decoded
+TYPE_SNIFF_KEY = b'"type":"'
+# Matches a wanted "type" of each profile; lines where one sits where the sniff looks are decoded anyway
+PROFILE_TYPE_MARKERS = {
+    profile: re.compile(re.escape(TYPE_SNIFF_KEY) + b'(?:' + b'|'.join(
+        re.escape(record_type.encode()) for record_type in sorted(record_types)) + b')"')
+    for profile, record_types in PROFILE_RECORD_TYPES.items()
+}
+# The start of a string that could be bare base64; backslashes let JSON-escaped line breaks through
+BASE64_STRING_START = re.compile(rb'"[A-Za-z0-9+/_\-\\]{%d}' % BASE64_MIN_LENGTH)
+
+CHUNK_CACHE_DIR = "chunk_cache"
+
+# Project listing: threads scanning project directories, processes tokenizing files (None = CPU count)
+STATS_SCAN_THREADS = 8
+STATS_TOKENIZE_WORKERS = None
+# Analysis runs filter stale session files in worker processes only past this many bytes; spawning
+# workers (each importing this module) takes a couple of seconds, about what filtering this much costs
+INGEST_POOL_MIN_BYTES = 128 * 1024 * 1024
+# Leading bytes hashed to tell an appended session file from a rewritten one
+STATS_HEAD_HASH_BYTES = 4096
+# Payload is tokenized in newline-aligned blocks of about this size, so memory stays flat
+TOKENIZE_BLOCK_BYTES = 1024 * 1024
+
+# --fast-estimate: whole lines read at random offsets of each file (small files are read whole),
+# lines tokenized to calibrate the tokens-per-byte ratio of each kind of record, and held-out folds
+# used for the error bound
+ESTIMATE_SAMPLE_LINES = 64
+ESTIMATE_WHOLE_FILE_BYTES = 256 * 1024
+ESTIMATE_CALIBRATION_LINES = 2000
+ESTIMATE_FOLDS = 10
+MANIFEST_SUFFIX = ".manifest.json"
+
+class GeminiCallError(Exception):
+    """A failed Gemini call, classified so the retry logic knows what to do with it."""
+    kind = "unknown"
+    retryable = True
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after  # Delay requested by the server, in seconds
+
+
+class RateLimitError(GeminiCallError):
+    kind = "rate-limit"
+
+
+class QuotaExhaustedError(GeminiCallError):
+    kind = "quota-exhausted"
+    retryable = False
+
+
+class AuthError(GeminiCallError):
+    kind = "auth"
+    retryable = False
+
+
+class GeminiTimeoutError(GeminiCallError):
+    kind = "timeout"
+
+
+class TransientError(GeminiCallError):
+    kind = "transient"
+
+
+class FatalError(GeminiCallError):
+    kind = "fatal"
+    retryable = False
+
+
+def _status_codes(codes: str) -> str:
+    # HTTP status codes as standalone numbers, not file:line:col positions in a stack trace
+    return rf"(?<![:\d.])\b(?:{codes})\b(?![:\d])"
+
+
+# Patterns checked in order against CLI stderr and API error messages; first match wins
+ERROR_PATTERNS = [
+    (AuthError, re.compile(r"(?-i:UNAUTHENTICATED|PERMISSION_DENIED)|API key not valid|invalid authentication|"
+                           r"login required|Please set an Auth method|" + _status_codes("401|403"), re.IGNORECASE)),
+    (QuotaExhaustedError, re.compile(r"per ?day|PerDay|daily (?:limit|quota)|billing|insufficient[_ ]quota",
+                                     re.IGNORECASE)),
+    (RateLimitError, re.compile(r"(?-i:RESOURCE_EXHAUSTED)|Quota exceeded|rate limit|too many requests|" +
+                                _status_codes("429"), re.IGNORECASE)),
+    (GeminiTimeoutError, re.compile(r"(?-i:DEADLINE_EXCEEDED|ETIMEDOUT)|timed? ?out|" + _status_codes("504"),
+                                    re.IGNORECASE)),
+    (TransientError, re.compile(r"(?-i:UNAVAILABLE|INTERNAL|ECONNRESET|ECONNREFUSED)|overloaded|socket hang up|"
+                                r"fetch failed|" + _status_codes("500|502|503"), re.IGNORECASE)),
+]
+RETRY_DELAY_PATTERNS = [
+    re.compile(r'"retryDelay":\s*"(\d+(?:\.\d+)?)s"'),
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*(ms|s)\b", re.IGNORECASE),
+]
+
+
+def parse_retry_delay(text: str) -> Optional[float]:
+    """Extract a server-provided retry delay in seconds from an error message."""
+    for pattern in RETRY_DELAY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            seconds = float(match.group(1))
+            if match.lastindex and match.lastindex > 1 and match.group(2) == "ms":
+                seconds /= 1000
+            return seconds
+    return None
+
+
+def classify_error_text(text: str, default: type = FatalError,
+                        retry_after: Optional[float] = None) -> GeminiCallError:
+    """Turn raw error text into a typed GeminiCallError."""
+    # Pull the most relevant message out of a JSON error body if there is one
+    match = re.search(r'"message":\s*"([^"]+)"', text)
+    message = match.group(1) if match else (text.strip()[-300:] or "no error output")
+    
+    if retry_after is None:
+        retry_after = parse_retry_delay(text)
+    error_type = next((t for t, pattern in ERROR_PATTERNS if pattern.search(text)), None)
+    if error_type is None:
+        # Text that only asks to be retried later is a rate limit, not a reason to give up
+        error_type = RateLimitError if retry_after is not None and not default.retryable else default
+    if error_type is RateLimitError and retry_after and retry_after > MAX_RETRY_AFTER_SECONDS:
+        error_type = QuotaExhaustedError
+    return error_type(message, retry_after=retry_after)
+
+
+def classify_api_error(e: Exception) -> GeminiCallError:
+    """Classify an exception raised by the OpenAI-compatible Gemini API client."""
+    if isinstance(e, openai.APITimeoutError):
+        return GeminiTimeoutError(str(e))
+    if isinstance(e, openai.APIConnectionError):
+        return TransientError(str(e))
+    if isinstance(e, openai.AuthenticationError) or isinstance(e, openai.PermissionDeniedError):
+        return AuthError(str(e))
+    if isinstance(e, openai.APIStatusError):
+        retry_after = None
+        headers = e.response.headers if e.response is not None else {}
+        if headers.get("retry-after-ms"):
+            retry_after = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            try:
+                retry_after = float(headers["retry-after"])
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(headers["retry-after"])
+                    retry_after = max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+        text = f"{e.status_code} {e}"
+        if e.status_code == 429:
+            return classify_error_text(text, default=RateLimitError, retry_after=retry_after)
+        if e.status_code >= 500 or e.status_code in (408, 409):
+            return classify_error_text(text, default=TransientError, retry_after=retry_after)
+        # Other 4xx responses won't get better by asking again
+        return FatalError(str(e), retry_after=retry_after)
+    return FatalError(f"{type(e).__name__}: {e}")
+
+
+def classify_gemini_error(e: Exception) -> GeminiCallError:
+    """Classify any exception raised while calling either backend."""
+    if isinstance(e, GeminiCallError):
+        return e
+    if isinstance(e, subprocess.CalledProcessError):
+        return SubProcessExecutionResult(e.returncode, e.output or "", e.stderr or "").classify()
+    if isinstance(e, subprocess.TimeoutExpired):
+        return GeminiTimeoutError(f"Gemini CLI timed out after {e.timeout} seconds")
+    if isinstance(e, openai.OpenAIError):
+        return classify_api_error(e)
+    # Anything else (a missing gemini executable, a bug) won't be fixed by retrying
+    return FatalError(f"{type(e).__name__}: {e}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting, without running a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding() -> Optional[tiktoken.Encoding]:
+    """Load the tiktoken encoding once per process; None if it can't be loaded (e.g. offline)."""
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the shared encoding, falling back to an estimate without one."""
+    encoding = get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    # Transcripts can contain special-token text like <|endoftext|>; count it as plain text
+    return len(encoding.encode_ordinary(text))
+
+
+def count_tokens_batch(texts: List[str], num_threads: int = TOKENIZER_THREADS) -> List[int]:
+    """Count tokens of many texts at once, encoding them on parallel threads."""
+    encoding = get_encoding()
+    if encoding is None:
+        return [estimate_tokens(text) for text in texts]
+    if num_threads <= 1 or len(texts) <= 1:
+        return [len(encoding.encode_ordinary(text)) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts, num_threads=num_threads)]
+
+
+def scan_jsonl_files(project_dir: Path) -> List[Tuple[str, os.stat_result]]:
+    """List a project's JSONL files with their stat results, in a single directory pass."""
+    files = []
+    try:
+        with os.scandir(project_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".jsonl") and entry.is_file():
+                    files.append((entry.path, entry.stat()))
+    except OSError:
+        pass  # Project vanished or is unreadable; treat it as empty
+    return files
+
+
+def hash_file_head(f, offset: int) -> str:
+    """Hash the start of an open binary file, up to offset or STATS_HEAD_HASH_BYTES."""
+    f.seek(0)
+    return hashlib.sha256(f.read(min(offset, STATS_HEAD_HASH_BYTES))).hexdigest()
+
+
+def base64_decoded_size(data: str) -> int:
+    """Return how many bytes a base64 string decodes to."""
+    length = len(data) - data.count('\n') - data.count('\r')
+    return length * 3 // 4 - data.rstrip().count('=', -2)
+
+
+def is_base64_shaped(data: str) -> bool:
+    """Whether a string of base64 characters is laid out like encoded data.
+    
+    Requires a single line or lines wrapped at a standard width, one alphabet, a length that
+    base64 can have, and a mix of upper case, lower case and digits.
+    """
+    lines = data.rstrip().split('\n')
+    if len(lines) > 1:
+        lines = [line.rstrip('\r') for line in lines]
+        width = len(lines[0])
+        if (width not in BASE64_LINE_WIDTHS or not 0 < len(lines[-1]) <= width
+                or any(len(line) != width for line in lines[1:-1])):
+            return False
+    body = ''.join(lines)
+    if not BASE64_BODY_PATTERN.fullmatch(body):
+        return False
+    # Padded base64 comes in whole 4-character groups; unpadded, a group can't be cut to one character
+    if len(body) % 4 != 0 if body.endswith('=') else len(body) % 4 == 1:
+        return False
+    return all(pattern.search(body) for pattern in BASE64_CHARACTER_CLASSES)
+
+
+def strip_base64_source(block: Dict[str, Any], stats: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Replace the data of an Anthropic-style {"source": {"type": "base64", ...}} block with a placeholder."""
+    source = block.get('source')
+    if isinstance(source, dict) and source.get('type') == 'base64' and isinstance(source.get('data'), str):
+        # An image or document content block; keep its type and media type, drop the data
+        block_type = str(block.get('type', 'binary')).upper()
+        media_type = source.get('media_type', 'unknown')
+        text = f"[{block_type}: {media_type}, {base64_decoded_size(source['data']):,} bytes removed]"
+        record_stripped(stats, source['data'], text)
+        block = {**block, 'source': {**source, 'data': text}}
+    return block
+
+
+def record_stripped(stats: Optional[Dict[str, int]], original: str, placeholder: str):
+    if stats is not None:
+        stats['blocks'] = stats.get('blocks', 0) + 1
+        stats['bytes'] = stats.get('bytes', 0) + len(original) - len(placeholder)
+
+
+def strip_base64_images(content: Any, stats: Optional[Dict[str, int]] = None) -> Any:
+    """Recursively strip base64 images and other binary payloads, replacing each with a placeholder.
+    
+    Catches data URLs, Anthropic-style {"source": {"type": "base64", "data": ...}} image and
+    document blocks, and any long string that is nothing but base64. Placeholders record the
+    decoded size; stats, if given, accumulates 'blocks' stripped and 'bytes' saved.
+    """
+    if isinstance(content, str):
+        # Check if this is a base64 image data URL
+        if content.startswith("data:image/") and ";base64," in content:
+            # Extract the image type for the placeholder message
+            image_type = content.split(";")[0].split("/")[1]
+            size = base64_decoded_size(content.split(";base64,", 1)[1])
+            text = f"[IMAGE: {image_type}, {size:,} bytes removed]"
+            record_stripped(stats, content, text)
+            return text
+        # Bare base64 (e.g. a file a tool read back); long enough that it can't be prose
+        if len(content) >= BASE64_MIN_LENGTH and BASE64_PATTERN.fullmatch(content) and is_base64_shaped(content):
+            text = f"[BINARY: {base64_decoded_size(content):,} bytes of base64 removed]"
+            record_stripped(stats, content, text)
+            return text
+        return content
+    elif isinstance(content, list):
+        return [strip_base64_images(item, stats) for item in content]
+    elif isinstance(content, dict):
+        content = strip_base64_source(content, stats)
+        return {key: strip_base64_images(value, stats) for key, value in content.items()}
+    else:
+        return content
+
+
+@functools.lru_cache(maxsize=None)
+def get_projection(profile: str) -> Dict[str, Any]:
+    """Compile a projection profile's paths into a tree of nested dicts; an empty dict keeps a whole value."""
+    tree: Dict[str, Any] = {}
+    for path in PROJECTION_PROFILES[profile]:
+        *parents, leaf = path.split(".")
+        node = tree
+        for part in parents:
+            if part in node and not node[part]:
+                break  # A shorter path already keeps this whole value
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = {}
+    return tree
+
+
+def project_value(value: Any, tree: Dict[str, Any], stats: Optional[Dict[str, int]] = None,
+                  strip: bool = True) -> Any:
+    """Keep only the paths in tree, stripping binary payloads from what is kept (if strip), in one pass."""
+    if not tree or not isinstance(value, (dict, list)):
+        return strip_base64_images(value, stats) if strip else value
+    if isinstance(value, list):
+        return [project_value(item, tree, stats, strip) for item in value]
+    if strip:
+        value = strip_base64_source(value, stats)
+    projected = {}
+    for key, subtree in tree.items():
+        if key in value:
+            kept = project_value(value[key], subtree, stats, strip)
+            if kept != {}:
+                projected[key] = kept
+    return projected
+
+
+def sniff_record_type(line: bytes) -> Optional[str]:
+    """Read a record's top-level "type" from the ends of its raw line without decoding it.
+    
+    Claude Code writes the record's scalar fields (uuids, cwd, type, timestamp) either
+    before the message or after it. A "type" key is top-level when no other object or
+    array opens before it (at the start of the line), or closes after it (at the end).
+    Returns None when neither can be confirmed, so callers fall back to decoding the line.
+    """
+    start = line.find(TYPE_SNIFF_KEY, 0, TYPE_SNIFF_BYTES)
+    if start != -1:
+        prefix = line[:start]
+        if prefix.count(b'{') == 1 and b'[' not in prefix and prefix.lstrip().startswith(b'{'):
+            return read_sniffed_type(line, start)
+    start = line.rfind(TYPE_SNIFF_KEY, max(0, len(line) - TYPE_SNIFF_BYTES))
+    if start != -1:
+        record_type = read_sniffed_type(line, start)
+        suffix = line[start:].rstrip()
+        if record_type is not None and suffix.count(b'}') == 1 and b']' not in suffix and suffix.endswith(b'}'):
+            return record_type
+    return None
+
+
+def read_sniffed_type(line: bytes, start: int) -> Optional[str]:
+    """Return the string value of the "type" key at start, or None if it has escapes."""
+    value_start = start + len(TYPE_SNIFF_KEY)
+    value_end = line.find(b'"', value_start, value_start + TYPE_SNIFF_BYTES)
+    if value_end == -1 or b'\\' in line[value_start:value_end]:
+        return None
+    return line[value_start:value_end].decode('utf-8', errors='replace')
+
+
+def mentions_record_type(line: bytes, marker: re.Pattern) -> bool:
+    """Whether a wanted "type" appears where sniff_record_type looks; such lines are decoded anyway."""
+    return (marker.search(line, len(line) - TYPE_SNIFF_BYTES) is not None
+            or marker.search(line, 0, TYPE_SNIFF_BYTES) is not None)
+
+
+def may_hold_binary(line: bytes) -> bool:
+    """Whether a raw line could contain anything strip_base64_images would replace."""
+    # Data URLs and {"type": "base64"} sources both spell out base64
+    if b'base64' in line:
+        return True
+    return len(line) > BASE64_MIN_LENGTH and BASE64_STRING_START.search(line) is not None
+
+
+class CodecFallback(Exception):
+    """Raised by a fast codec for a line it can't handle exactly like json; json handles the line instead."""
+
+
+class JsonCodec:
+    """Decodes raw JSONL lines and encodes payload records with the stdlib json module.
+    
+    Faster codecs subclass it and must produce byte-identical payloads, so cached payloads
+    stay valid whichever is installed. Where they can't be sure of that (NaN, integers past
+    64 bits, floats they print differently) they raise CodecFallback.
+    """
+    
+    name = "json"
+    
+    @classmethod
+    def available(cls) -> bool:
+        return True
+    
+    def decode(self, line: bytes, profile: str) -> Any:
+        """Decode a line into the record, or as much of it as the profile reads; ValueError if invalid."""
+        return json.loads(line)
+    
+    def encode(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+    
+    def self_check(self) -> bool:
+        """Whether this codec turns the probe lines into the same payloads and stats as json."""
+        reference = JsonCodec()
+        for profile in PROJECTION_PROFILES:
+            for line in CODEC_PROBE_LINES:
+                expected_stats, stats = {}, {}
+                try:
+                    expected = filter_jsonl_line(line, profile, expected_stats, reference)
+                except Exception:
+                    expected = expected_stats = "error"
+                try:
+                    payload = filter_jsonl_line(line, profile, stats, self)
+                except Exception:
+                    payload = stats = "error"
+                if (payload, stats) != (expected, expected_stats):
+                    return False
+        return True
+
+
+def is_exact_float(value: float) -> bool:
+    return value == 0 or EXACT_FLOAT_RANGE[0] <= abs(value) < EXACT_FLOAT_RANGE[1]
+
+
+def has_inexact_float(value: Any) -> bool:
+    """Whether a decoded value holds a float that json would print differently from the fast codecs."""
+    if isinstance(value, float):
+        return not is_exact_float(value)
+    if isinstance(value, dict):
+        return any(has_inexact_float(item) for item in value.values())
+    if isinstance(value, list):
+        return any(has_inexact_float(item) for item in value)
+    return False
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson: decodes and encodes the whole record several times faster than json."""
+    
+    name = "orjson"
+    
+    @classmethod
+    def available(cls) -> bool:
+        return orjson is not None
+    
+    def decode(self, line: bytes, profile: str) -> Any:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            raise CodecFallback()  # NaN, lone surrogates...; json decides whether the line is valid
+    
+    def encode(self, record: Dict[str, Any]) -> str:
+        # orjson reads integers past 64 bits as floats, and prints tiny and huge floats its own way
+        if has_inexact_float(record):
+            raise CodecFallback()
+        try:
+            return orjson.dumps(record).decode('utf-8')
+        except TypeError:
+            raise CodecFallback()
+
+
+@functools.lru_cache(maxsize=None)
+def get_record_struct(profile: str) -> type:
+    """Return a msgspec struct holding only the top-level record fields that filter_record reads."""
+    fields = sorted(set(get_projection(profile)) | {'type', 'isMeta', 'source'})
+    return msgspec.defstruct(f"Record_{profile.replace('-', '_')}",
+                             [(field, Any, msgspec.UNSET) for field in fields])
+
+
+def decode_exact_float(literal: str) -> float:
+    value = float(literal)
+    if not is_exact_float(value):
+        raise CodecFallback()
+    return value
+
+
+class MsgspecCodec(JsonCodec):
+    """msgspec: decodes into a per-profile struct, skipping fields no profile path reads
+    (uuids, usage, and the duplicated toolUseResult unless the profile keeps it)."""
+    
+    name = "msgspec"
+    
+    def __init__(self):
+        self.decoders: Dict[str, Any] = {}
+        self.encoder = msgspec.json.Encoder()
+    
+    @classmethod
+    def available(cls) -> bool:
+        return msgspec is not None
+    
+    def decode(self, line: bytes, profile: str) -> Any:
+        decoder = self.decoders.get(profile)
+        if decoder is None:
+            decoder = self.decoders[profile] = msgspec.json.Decoder(get_record_struct(profile),
+                                                                     float_hook=decode_exact_float)
+        try:
+            record = decoder.decode(line)
+        except (msgspec.DecodeError, msgspec.ValidationError):
+            raise CodecFallback()  # Includes records that aren't objects; json sorts those out
+        return {field: getattr(record, field) for field in record.__struct_fields__
+                if getattr(record, field) is not msgspec.UNSET}
+    
+    def encode(self, record: Dict[str, Any]) -> str:
+        return self.encoder.encode(record).decode('utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def get_json_codec() -> JsonCodec:
+    """Pick the fastest installed codec that passes its self-check, once per process."""
+    codecs = {codec.name: codec for codec in (MsgspecCodec, OrjsonCodec, JsonCodec)}
+    for name in JSON_CODECS:
+        if codecs[name].available():
+            codec = codecs[name]()
+            if codec.self_check():
+                return codec
+    return JsonCodec()
+
+
+def filter_record(data: Dict[str, Any], profile: str, stats: Optional[Dict[str, int]] = None,
+                  strip: bool = True) -> Optional[Dict[str, Any]]:
+    """Keep only the fields of a conversation record that the projection profile sends for analysis."""
+    record_types = PROFILE_RECORD_TYPES.get(profile)
+    if record_types is not None and data.get('type') not in record_types:
+        return None
+    if profile in PROFILES_WITHOUT_META and data.get('isMeta'):
+        return None
+    filtered_data = project_value(data, get_projection(profile), stats, strip)
+    
+    # Only keep it if we have meaningful content
+    if filtered_data and ('message' in filtered_data or 'type' in filtered_data):
+        return filtered_data
+    return None
+
+
+def filter_jsonl_line(line: bytes, profile: str, stats: Optional[Dict[str, int]] = None,
+                      codec: Optional[JsonCodec] = None) -> Optional[str]:
+    """Turn one raw JSONL line into the compact JSON line sent for analysis, or None if it is dropped."""
+    # Drop records of types the profile doesn't send before paying for a full decode
+    record_types = PROFILE_RECORD_TYPES.get(profile)
+    if record_types is not None and not mentions_record_type(line, PROFILE_TYPE_MARKERS[profile]):
+        record_type = sniff_record_type(line)
+        if record_type is not None and record_type not in record_types:
+            return None
+    codec = codec or get_json_codec()
+    try:
+        return decode_and_filter(codec, line, profile, stats)
+    except CodecFallback:
+        return decode_and_filter(JsonCodec(), line, profile, stats)
+
+
+def decode_and_filter(codec: JsonCodec, line: bytes, profile: str,
+                      stats: Optional[Dict[str, int]] = None) -> Optional[str]:
+    try:
+        data = codec.decode(line, profile)
+    except ValueError:
+        return None  # Silently skip invalid lines
+    if not isinstance(data, dict):
+        return None
+    strip = profile not in PROFILES_GATING_BINARY or may_hold_binary(line)
+    # Stats are only added once the line made it through, so a codec fallback can't count twice
+    line_stats: Dict[str, int] = {}
+    filtered_data = filter_record(data, profile, line_stats, strip)
+    payload = codec.encode(filtered_data) if filtered_data else None
+    if stats is not None:
+        for key, value in line_stats.items():
+            stats[key] = stats.get(key, 0) + value
+    return payload
+
+
+@contextmanager
+def lock_payload(payload_path: str):
+    """Hold an exclusive lock on a payload file, so processes refreshing the same project take turns writing it."""
+    os.makedirs(os.path.dirname(payload_path), exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(payload_path + PAYLOAD_LOCK_SUFFIX, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield  # Closing the lock file releases the lock
+
+
+def update_file_payload(file_path: str, payload_path: str, profile: str, previous: Optional[Dict[str, Any]] = None,
+                        num_threads: int = TOKENIZER_THREADS) -> Dict[str, Any]:
+    """Filter one session file into its payload file with a projection profile and count the payload's tokens.
+    
+    Session files are append-only, so given the file's previous payload entry, only the
+    complete lines after its offset are filtered, appended to the payload file and counted.
+    If the file shrank, its head changed, the payload file isn't the one the entry describes
+    (another process updated it meanwhile) or there is no previous entry, the payload is rebuilt
+    from the start into a temporary file that then replaces it, so readers never see it half
+    written. The payload file is locked while it is written. Lines are read one at a time and tokenized in blocks of
+    TOKENIZE_BLOCK_BYTES, num_threads blocks at a time, so memory doesn't grow with the file.
+    
+    Returns the new entry: tokens, offset, head_hash, payload_size, stripped_blocks and
+    stripped_bytes. Module-level so it can run in a worker process.
+    """
+    previous = previous or {}
+    offset = previous.get('offset', 0)
+    tokens = previous.get('tokens', 0)
+    stats = {'blocks': previous.get('stripped_blocks', 0), 'bytes': previous.get('stripped_bytes', 0)}
+    temp_path = payload_path + PAYLOAD_TEMP_SUFFIX
+    try:
+        with open(file_path, 'rb') as f, lock_payload(payload_path):
+            if offset and (offset > os.fstat(f.fileno()).st_size
+                           or hash_file_head(f, offset) != previous.get('head_hash')
+                           or get_file_size(payload_path) != previous.get('payload_size')):
+                offset, tokens = 0, 0
+            rebuild = not offset
+            if rebuild:
+                stats = {'blocks': 0, 'bytes': 0}
+            with open(temp_path if rebuild else payload_path, 'w' if rebuild else 'a', encoding='utf-8') as out:
+                block = []
+                block_size = 0
+                full_blocks = []
+                
+                def flush_block(last: bool = False):
+                    nonlocal tokens, block_size
+                    text = ''.join(block)
+                    out.write(text)
+                    full_blocks.append(text)
+                    block.clear()
+                    block_size = 0
+                    if last or len(full_blocks) >= num_threads:
+                        tokens += sum(count_tokens_batch(full_blocks, num_threads))
+                        full_blocks.clear()
+                
+                f.seek(offset)
+                for line in f:
+                    # Leave a partly written last line for the next refresh
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    payload = filter_jsonl_line(line, profile, stats)
+                    if payload is not None:
+                        block.append(payload + '\n')
+                        block_size += len(payload) + 1
+                        if block_size >= TOKENIZE_BLOCK_BYTES:
+                            flush_block()
+                flush_block(last=True)
+                payload_size = out.tell()
+            if rebuild:
+                os.replace(temp_path, payload_path)
+            head_hash = hash_file_head(f, offset)
+    except OSError:
+        # Skip files that can't be read
+        offset, tokens, head_hash, payload_size, stats = 0, 0, None, 0, {'blocks': 0, 'bytes': 0}
+    return {
+        'tokens': tokens,
+        'offset': offset,
+        'head_hash': head_hash,
+        'payload_size': payload_size,
+        'stripped_blocks': stats['blocks'],
+        'stripped_bytes': stats['bytes'],
+        'payload_version': PAYLOAD_VERSION
+    }
+
+
+def get_file_size(path: str) -> Optional[int]:
+    """Return a file's size, or None if it doesn't exist."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def sample_jsonl_lines(file_path: str, size: int) -> List[bytes]:
+    """Return complete lines read at random byte offsets of a file, or all of them for a small file.
+    
+    Each offset's partly covered line is skipped and the next line is read whole, however long,
+    so the large tool-result records are sampled as often as short ones. Offsets are seeded by
+    the file's name and size, so an unchanged file always gives the same sample.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if size <= ESTIMATE_WHOLE_FILE_BYTES:
+                return [line for line in f.read().split(b'\n') if line.strip()]
+            rng = random.Random(f"{os.path.basename(file_path)}:{size}")
+            lines = {}
+            for offset in sorted(rng.randrange(size) for _ in range(ESTIMATE_SAMPLE_LINES)):
+                f.seek(offset)
+                if offset:
+                    f.readline()
+                start = f.tell()
+                line = f.readline()
+                # A missing newline means the end of the file, possibly still being written
+                if line.endswith(b'\n') and line.strip():
+                    lines[start] = line.rstrip(b'\n')
+            return list(lines.values())
+    except OSError:
+        return []
+
+
+def get_record_type(line: bytes) -> str:
+    """Return the top-level "type" of a JSONL record, or "unknown"."""
+    record_type = sniff_record_type(line)
+    if record_type is not None:
+        return record_type
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return "unknown"
+    return record.get('type', "unknown") if isinstance(record, dict) else "unknown"
+
+
+def get_ratio_class(line: bytes) -> str:
+    """Return the class a line's tokens-per-byte ratio is calibrated in: its record type, and
+    whether it may carry binary data, which is mostly stripped and so has far fewer tokens per byte."""
+    record_type = get_record_type(line)
+    return f"{record_type}+binary" if may_hold_binary(line) else record_type
+
+
+def measure_lines(lines: List[bytes], profile: str) -> List[Tuple[str, int, int]]:
+    """Return (ratio class, raw bytes, payload tokens) of raw JSONL lines, newlines included."""
+    payloads = [filter_jsonl_line(line, profile) for line in lines]
+    counts = iter(count_tokens_batch([payload for payload in payloads if payload is not None]))
+    return [(get_ratio_class(line), len(line) + 1, next(counts) + 1 if payload is not None else 0)
+            for line, payload in zip(lines, payloads)]
+
+
+class TokenEstimator:
+    """Estimate payload token counts from raw byte counts with a ratio per record type (see get_ratio_class).
+    
+    The ratios are calibrated by filtering and tokenizing a random subset of sampled lines. error_bound is
+    the 90th percentile relative error when predicting held-out folds of that subset.
+    """
+    
+    def __init__(self, sampled_lines: Iterable[bytes], profile: str, seed: int = 0):
+        lines = list(sampled_lines)
+        rng = random.Random(seed)
+        lines = rng.sample(lines, min(len(lines), ESTIMATE_CALIBRATION_LINES))
+        # (ratio class, raw bytes, payload tokens)
+        self.measurements = measure_lines(lines, profile)
+        self.ratios, self.default_ratio = self.fit(self.measurements)
+        self.error_bound = self.cross_validate()
+    
+    @staticmethod
+    def fit(measurements: List[Tuple[str, int, int]]) -> Tuple[Dict[str, float], float]:
+        """Return the tokens-per-byte ratio of each ratio class, and of all records together."""
+        type_bytes: Dict[str, int] = {}
+        type_tokens: Dict[str, int] = {}
+        for record_type, n_bytes, n_tokens in measurements:
+            type_bytes[record_type] = type_bytes.get(record_type, 0) + n_bytes
+            type_tokens[record_type] = type_tokens.get(record_type, 0) + n_tokens
+        total_bytes = sum(type_bytes.values())
+        default_ratio = sum(type_tokens.values()) / total_bytes if total_bytes else 1 / CHARS_PER_TOKEN
+        return {t: type_tokens[t] / type_bytes[t] for t in type_bytes}, default_ratio
+    
+    def cross_validate(self) -> Optional[float]:
+        """Predict each fold's token total from the other folds and return the p90 relative error."""
+        folds = [self.measurements[i::ESTIMATE_FOLDS] for i in range(ESTIMATE_FOLDS)]
+        errors = []
+        for i, fold in enumerate(folds):
+            training = [m for j, other in enumerate(folds) if j != i for m in other]
+            actual = sum(n_tokens for _, _, n_tokens in fold)
+            if not training or not actual:
+                continue
+            ratios, default_ratio = self.fit(training)
+            predicted = sum(n_bytes * ratios.get(t, default_ratio) for t, n_bytes, _ in fold)
+            errors.append(abs(predicted - actual) / actual)
+        return percentile(errors, 90) if errors else None
+    
+    def estimate_file(self, size: int, sampled_lines: List[bytes]) -> int:
+        """Estimate a file's tokens from its size, weighting ratios by the bytes of each class sampled from it."""
+        sampled_bytes = 0
+        weighted = 0.0
+        for line in sampled_lines:
+            sampled_bytes += len(line) + 1
+            weighted += (len(line) + 1) * self.ratios.get(get_ratio_class(line), self.default_ratio)
+        ratio = weighted / sampled_bytes if sampled_bytes else self.default_ratio
+        return int(size * ratio)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def get_backoff_seconds(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with jitter, or the server's requested delay plus jitter."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    ceiling = min(MAX_BACKOFF_SECONDS, INITIAL_BACKOFF_SECONDS * (2 ** attempt))
+    # Equal jitter: never retry immediately, but spread workers that failed together
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class ChunkCache:
+    """On-disk cache of chunk analyses, keyed by a hash of everything that shapes the response.
+    
+    Calls run at temperature 0, so the same backend, model, prompt and chunk give the same
+    answer; re-running a project (or resuming after a crash) only pays for changed chunks.
+    """
+    
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(backend: str, model: str, prompt: str, chunk: str) -> str:
+        digest = hashlib.sha256()
+        for part in (backend, model, prompt, chunk):
+            data = part.encode('utf-8')
+            # Length-prefix each part so different splits can't collide
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        cache_file = self.cache_dir / f"{key}.md"
+        try:
+            response = cache_file.read_text()
+        except FileNotFoundError:
+            response = None
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+    
+    def put(self, key: str, response: str):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_file = self.cache_dir / f"{key}.md"
+        # Write then rename, so a crash never leaves a truncated entry behind
+        tmp_file = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_file.write_text(response)
+        os.replace(tmp_file, cache_file)
+    
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+class ProjectsStore:
+    """SQLite store of project and per-file stats, shared safely by concurrent runs.
+    
+    WAL mode lets a listing read while another run writes, and each project is upserted
+    together with its files in one transaction, so readers never see half an update.
+    Stats are kept per projection profile, since each profile sends a different payload.
+    """
+    
+    # Bumped whenever the tables change; older stores are only a cache, so they are rebuilt
+    SCHEMA_VERSION = 3
+    SCHEMA = """
+        DROP TABLE IF EXISTS projects;
+        DROP TABLE IF EXISTS files;
+        CREATE TABLE projects (
+            profile TEXT NOT NULL,
+            munged_name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            tokens INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (profile, munged_name)
+        );
+        CREATE TABLE files (
+            profile TEXT NOT NULL,
+            munged_name TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            inode INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            tokens INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            head_hash TEXT,
+            payload_size INTEGER NOT NULL,
+            stripped_blocks INTEGER NOT NULL DEFAULT 0,
+            stripped_bytes INTEGER NOT NULL DEFAULT 0,
+            payload_version INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (profile, munged_name, file_name)
+        );
+        -- delete_project removes a project under every profile, which the primary keys can't look up
+        CREATE INDEX projects_by_name ON projects (munged_name);
+        CREATE INDEX files_by_name ON files (munged_name);
+    """
+    FILE_COLUMNS = ("inode", "size", "mtime", "tokens", "offset", "head_hash", "payload_size",
+                    "stripped_blocks", "stripped_bytes", "payload_version")
+    
+    def __init__(self, db_path: Path, profile: str):
+        self.db_path = db_path
+        self.profile = profile
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Take the write lock before checking the version, so only one run rebuilds the tables
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                for statement in self.SCHEMA.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.commit()
+    
+    def connect(self) -> sqlite3.Connection:
+        # Wait for another run's write transaction rather than failing with "database is locked"
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    def load(self, munged_name: Optional[str] = None) -> Dict[str, Any]:
+        """Return {munged_name: project entry with its 'files'}, for one project or all of them."""
+        where, params = "WHERE profile = ?", (self.profile,)
+        if munged_name:
+            where, params = where + " AND munged_name = ?", params + (munged_name,)
+        with closing(self.connect()) as conn:
+            projects = {
+                name: {'size': size, 'tokens': tokens, 'mtime': mtime, 'files': {}}
+                for name, size, tokens, mtime in conn.execute(
+                    f"SELECT munged_name, size, tokens, mtime FROM projects {where}", params)
+            }
+            for row in conn.execute(
+                    f"SELECT munged_name, file_name, {', '.join(self.FILE_COLUMNS)} FROM files {where}", params):
+                if row[0] in projects:
+                    projects[row[0]]['files'][row[1]] = dict(zip(self.FILE_COLUMNS, row[2:]))
+        return projects
+    
+    def upsert_project(self, munged_name: str, entry: Dict[str, Any]):
+        """Write a project's totals and replace its file entries, atomically."""
+        files = entry.get('files', {})
+        key = (self.profile, munged_name)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO projects (profile, munged_name, size, tokens, mtime, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (profile, munged_name) DO UPDATE SET size = excluded.size, tokens = excluded.tokens, "
+                "mtime = excluded.mtime, updated_at = excluded.updated_at",
+                (*key, entry['size'], entry['tokens'], entry['mtime'], datetime.now().isoformat()))
+            # Evict entries of files that were deleted since the last update
+            known = conn.execute("SELECT file_name FROM files WHERE profile = ? AND munged_name = ?", key)
+            conn.executemany("DELETE FROM files WHERE profile = ? AND munged_name = ? AND file_name = ?",
+                             [(*key, name) for name, in known.fetchall() if name not in files])
+            conn.executemany(
+                f"INSERT INTO files (profile, munged_name, file_name, {', '.join(self.FILE_COLUMNS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(self.FILE_COLUMNS))}) "
+                f"ON CONFLICT (profile, munged_name, file_name) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in self.FILE_COLUMNS),
+                [(*key, name, *(file_entry.get(column) for column in self.FILE_COLUMNS))
+                 for name, file_entry in files.items()])
+    
+    def delete_project(self, munged_name: str):
+        """Forget a vanished project under every profile."""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM files WHERE munged_name = ?", (munged_name,))
+            conn.execute("DELETE FROM projects WHERE munged_name = ?", (munged_name,))
+
+
+class RunManifest:
+    """Checkpoint of a full analysis run: chunk hashes, per-chunk status and saved subreports.
+    
+    Written after every chunk so an interrupted run can be picked up with --resume,
+    redoing only the chunks that never finished.
+    """
+    
+    def __init__(self, path: Path, project: str, mode: str):
+        self.path = path
+        self.project = project
+        self.mode = mode
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def load(self) -> bool:
+        """Load a previous checkpoint for the same project and mode; return whether one was found."""
+        try:
+            data = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return False
+        if data.get('project') != self.project or data.get('mode') != self.mode:
+            return False
+        self.chunks = {int(i): entry for i, entry in data.get('chunks', {}).items()}
+        return True
+    
+    def completed_subreport(self, index: int, chunk_hash: str) -> Optional[str]:
+        """Return the saved subreport for a chunk if it finished with identical content."""
+        entry = self.chunks.get(index)
+        if not entry or entry.get('status') != 'done' or entry.get('hash') != chunk_hash:
+            return None
+        subreport_path = entry.get('subreport')
+        if not subreport_path or not Path(subreport_path).exists():
+            return None
+        # Drop the "# Subreport" header line written in front of the analysis
+        return Path(subreport_path).read_text().split("\n\n", 1)[-1]
+    
+    def count(self, status: str) -> int:
+        return sum(1 for entry in self.chunks.values() if entry.get('status') == status)
+    
+    def record_chunk(self, index: int, chunk_hash: str, status: str, subreport: Optional[Path] = None):
+        with self._lock:
+            self.chunks[index] = {
+                'hash': chunk_hash,
+                'status': status,
+                'subreport': str(subreport) if subreport else None,
+            }
+        self.save()
+    
+    def save(self):
+        with self._lock:
+            data = {
+                'project': self.project,
+                'mode': self.mode,
+                'updated': datetime.now().isoformat(),
+                'chunks': {str(i): entry for i, entry in sorted(self.chunks.items())},
+            }
+            tmp_file = self.path.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data, indent=2))
+            os.replace(tmp_file, self.path)
+    
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+
 
 class SubProcessExecutionResult:
     def __init__(self, returncode, stdout, stderr):
@@ -56,7 +1235,82 @@ class SubProcessExecutionResult:
         self.stdout = stdout
         self.stderr = stderr
     
-    # take stderror raw text and figure out what the error was
+    def classify(self) -> GeminiCallError:
+        """Take the raw stderr text of a failed CLI call and figure out what the error was."""
+        return classify_error_text(f"exit code {self.returncode}\n{self.stderr}")
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests per minute and input tokens per minute.
+    
+    One instance is shared by all workers of a backend. acquire() blocks until both
+    buckets can cover the request and records how long the caller waited. Setting the
+    optional shutdown event wakes every waiting caller with a FatalError.
+    """
+    
+    def __init__(self, requests_per_minute: Optional[int], tokens_per_minute: Optional[int],
+                 shutdown: Optional[threading.Event] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._shutdown = shutdown or threading.Event()
+        # Buckets start full, matching the per-minute windows the providers use
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waits: List[float] = []
+    
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(float(self.requests_per_minute),
+                                          self._request_allowance + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._token_allowance = min(float(self.tokens_per_minute),
+                                        self._token_allowance + elapsed * self.tokens_per_minute / 60)
+    
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of `tokens` input tokens is allowed; return the seconds waited."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                # A request larger than a whole minute's budget waits for a full bucket
+                needed_tokens = min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+                
+                delay = self._paused_until - now
+                if self.requests_per_minute and self._request_allowance < 1:
+                    delay = (1 - self._request_allowance) * 60 / self.requests_per_minute
+                if self.tokens_per_minute and self._token_allowance < needed_tokens:
+                    delay = max(delay, (needed_tokens - self._token_allowance) * 60 / self.tokens_per_minute)
+                
+                if delay <= 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= needed_tokens
+                    waited = now - start
+                    self.waits.append(waited)
+                    return waited
+            if self._shutdown.wait(delay):
+                raise FatalError("Run interrupted")
+    
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds`, e.g. after the server reported a rate limit."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def summary(self) -> str:
+        """Describe how much waiting the limiter imposed, for tuning the limits."""
+        if not self.waits:
+            return "no requests"
+        waits = sorted(self.waits)
+        throttled = sum(1 for w in waits if w > 0.01)
+        return (f"{len(waits)} requests, {throttled} throttled, "
+                f"waited {sum(waits):.1f}s total (median {waits[len(waits) // 2]:.2f}s, max {waits[-1]:.2f}s)")
 
 
 
@@ -66,7 +1320,20 @@ class ConversationAnalyzer(ABC):
     def __init__(self, args):
         self.args = args
         self.console = Console()
-        self._gemini_model_override_active = False
+        self._client: Optional[OpenAI] = None
+        self._client_lock = threading.Lock()
+        self._print_lock = threading.Lock()
+        self._cli_call_ids = itertools.count(1)
+        self._rate_limiters: Dict[str, RateLimiter] = {}
+        self._call_latencies: Dict[str, List[float]] = {}
+        self._chunk_cache: Optional[ChunkCache] = None
+        self._active_procs: set = set()
+        self._shutdown = threading.Event()
+        self.token_estimator: Optional[TokenEstimator] = None
+        self._projects_store: Optional[ProjectsStore] = None
+        self._stripped_blocks = 0
+        self._stripped_bytes = 0
+        self._stripped_whole_files = True
     
     @abstractmethod
     def get_analysis_prompt(self) -> str:
@@ -100,13 +1367,73 @@ class ConversationAnalyzer(ABC):
             self.console.print("[dim]Note: GOOGLE_APPLICATION_CREDENTIALS will be unset for Gemini CLI calls.[/dim]")
     
     def get_gemini_client(self) -> OpenAI:
-        """Get OpenAI client configured for Gemini."""
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("Please set GEMINI_API_KEY environment variable")
+        """Get OpenAI client configured for Gemini.
         
-        base_url = "https://generativelanguage.googleapis.com/v1beta/openai/"
-        return OpenAI(api_key=api_key, base_url=base_url)
+        The client is created once and shared by all worker threads so they reuse its
+        connection pool.
+        """
+        with self._client_lock:
+            if self._client is None:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("Please set GEMINI_API_KEY environment variable")
+                
+                base_url = "https://generativelanguage.googleapis.com/v1beta/openai/"
+                # Retries are handled by call_gemini so they are classified and rate limited
+                self._client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            return self._client
+    
+    def get_rate_limiter(self, use_cli: bool) -> RateLimiter:
+        """Get the rate limiter shared by all calls to the given backend."""
+        backend = "cli" if use_cli else "api"
+        with self._client_lock:
+            if backend not in self._rate_limiters:
+                limits = RATE_LIMITS.get((backend, GEMINI_MODEL), DEFAULT_RATE_LIMIT)
+                rpm = self.args.rpm if self.args.rpm is not None else limits["rpm"]
+                tpm = self.args.tpm if self.args.tpm is not None else limits["tpm"]
+                # Zero on the command line means unlimited
+                self._rate_limiters[backend] = RateLimiter(rpm or None, tpm or None, self._shutdown)
+            return self._rate_limiters[backend]
+    
+    def wait_for_rate_limit(self, use_cli: bool, *texts: str):
+        """Take one request and its estimated input tokens from the backend's rate limiter."""
+        tokens = sum(estimate_tokens(text) for text in texts)
+        self.get_rate_limiter(use_cli).acquire(tokens)
+    
+    def complete_with_api(self, system_prompt: str, user_content: str) -> str:
+        """Send one system + user prompt pair to the Gemini API and return the reply text (no retries)."""
+        client = self.get_gemini_client()
+        self.wait_for_rate_limit(False, system_prompt, user_content)
+        start_time = time.time()
+        try:
+            response = client.chat.completions.create(
+                model=GEMINI_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_content}
+                ],
+                temperature=0.0
+            )
+        finally:
+            self.record_latency("api", time.time() - start_time)
+        return response.choices[0].message.content or ""
+    
+    def print_run_summary(self):
+        """Print performance counters gathered during the run."""
+        print("\nRun summary:")
+        if self._stripped_blocks:
+            # Differential runs send only the new part of modified files, but the counts cover whole files
+            scope = "" if self._stripped_whole_files else "; whole-file totals, including content sent in earlier runs"
+            print(f"  Binary payloads stripped: {self._stripped_blocks:,} "
+                  f"({self.format_file_size(self._stripped_bytes)} saved{scope})")
+        if self._chunk_cache:
+            print(f"  Chunk cache: {self._chunk_cache.summary()}")
+        for backend, limiter in self._rate_limiters.items():
+            print(f"  Rate limiter ({backend}): {limiter.summary()}")
+        for backend, latencies in self._call_latencies.items():
+            print(f"  Call latency ({backend}): {len(latencies)} calls, p50 {percentile(latencies, 50):.1f}s, "
+                  f"p90 {percentile(latencies, 90):.1f}s, p99 {percentile(latencies, 99):.1f}s, "
+                  f"max {max(latencies):.1f}s")
     
     
     def munge_project_path(self, project_path: str) -> str:
@@ -174,93 +1501,211 @@ class ConversationAnalyzer(ABC):
         output_cost = (max_output_tokens / 1_000_000) * PRICE_PER_M_OUTPUT
         return input_cost + output_cost
     
-    def get_project_mtime(self, project_dir: Path) -> float:
+    def get_project_mtime(self, project_dir: Path,
+                          files: Optional[List[Tuple[str, os.stat_result]]] = None) -> float:
         """Get the most recent modification time of any file in the project."""
-        mtime = 0.0
-        for file_path in project_dir.glob("*.jsonl"):
-            file_mtime = file_path.stat().st_mtime
-            if file_mtime > mtime:
-                mtime = file_mtime
-        return mtime
-    
-    def load_projects_cache(self) -> Dict[str, Any]:
-        """Load the projects cache from disk."""
-        # Use output directory for cache file
-        cache_file = Path(self.args.out_dir if hasattr(self, 'args') else 'reports') / PROJECTS_CACHE_FILE
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r') as f:
-                    # Read JSON data, ignoring any trailing comment
-                    content = f.read()
-                    # Remove the cache marker comment if present
-                    if CACHE_MARKER in content:
-                        content = content[:content.find(CACHE_MARKER)].strip()
-                    return json.loads(content) if content else {}
-            except Exception as e:
-                print(f"[yellow]Warning: Could not load projects cache: {e}[/yellow]")
-                return {}
-        return {}
+        if files is None:
+            files = scan_jsonl_files(project_dir)
+        return max((st.st_mtime for _, st in files), default=0.0)
     
-    def save_projects_cache(self, cache: Dict[str, Any]):
-        """Save the projects cache to disk with timestamp."""
-        # Use output directory for cache file
-        output_dir = Path(self.args.out_dir if hasattr(self, 'args') else 'reports')
-        output_dir.mkdir(exist_ok=True)
-        cache_file = output_dir / PROJECTS_CACHE_FILE
-        
+    def get_projects_store(self) -> ProjectsStore:
+        """Return the projects store in the output directory, opening it on first use."""
+        with self._client_lock:
+            if self._projects_store is None:
+                self._projects_store = ProjectsStore(Path(self.args.out_dir) / PROJECTS_DB_FILE, self.get_profile())
+            return self._projects_store
+    
+    def load_projects_cache(self, munged_name: Optional[str] = None) -> Dict[str, Any]:
+        """Load the cached project stats from the projects store, for one project or all of them."""
         try:
-            # Write cache data with timestamp comment
-            with open(cache_file, 'w') as f:
-                json.dump(cache, f, indent=2)
-                f.write(f"\n{CACHE_MARKER} {datetime.now().isoformat()} -->")
-        except Exception as e:
+            return self.get_projects_store().load(munged_name)
+        except sqlite3.Error as e:
+            print(f"[yellow]Warning: Could not load projects cache: {e}[/yellow]")
+            return {}
+    
+    def save_projects_cache(self, cache: Dict[str, Any], project_names: Optional[Iterable[str]] = None):
+        """Upsert the given projects (all of them by default) into the projects store."""
+        try:
+            store = self.get_projects_store()
+            for munged_name in (cache if project_names is None else project_names):
+                store.upsert_project(munged_name, cache[munged_name])
+        except sqlite3.Error as e:
             print(f"[yellow]Warning: Could not save projects cache: {e}[/yellow]")
     
-    def calculate_project_stats(self, project_dir: Path, cache: Dict[str, Any] = None) -> Tuple[int, int]:
-        """Calculate total size and approximate token count for a project."""
-        # Check cache first
+    def calculate_project_stats(self, project_dir: Path, cache: Dict[str, Any] = None,
+                                pool: Optional[ProcessPoolExecutor] = None,
+                                on_file_ready: Optional[Callable[[str], None]] = None,
+                                min_pool_bytes: int = 0) -> Tuple[int, int]:
+        """Calculate total size and the token count of the filtered payload for a project.
+        
+        Each file is filtered once into a payload file under <out-dir>/payload_cache/, which
+        read_jsonl_files then streams, and its payload tokens are counted on the way. Results
+        are cached per file and only redone for files whose inode, size or mtime changed; files
+        that were appended to only have their new lines processed. Files are processed in the
+        given process pool when there is one and at least min_pool_bytes of them are new or changed.
+        on_file_ready, if given, is called with each file's
+        name once its payload is up to date: unchanged files first, then the rest in name order.
+        """
+        # One directory pass; its stat results serve the cache check and the size total
+        files = scan_jsonl_files(project_dir)
         project_name = project_dir.name
-        current_mtime = self.get_project_mtime(project_dir)
+        cached_files = cache.get(project_name, {}).get('files', {}) if cache else {}
         
-        if cache and project_name in cache:
-            cached_data = cache[project_name]
-            if cached_data.get('mtime', 0) >= current_mtime:
-                # Cache is still valid
-                return cached_data['size'], cached_data['tokens']
+        def payload_intact(file_name: str, entry: Dict[str, Any]) -> bool:
+            if entry.get('payload_version') != PAYLOAD_VERSION:
+                return False
+            payload_path = self.get_payload_path(project_dir, file_name)
+            return payload_path.exists() and payload_path.stat().st_size == entry.get('payload_size')
         
-        # Calculate fresh stats
-        total_size = 0
-        total_tokens = 0
+        # Reuse cached counts for unchanged files
+        file_entries = {}
+        stale = []
+        for path, st in files:
+            file_name = os.path.basename(path)
+            entry = cached_files.get(file_name)
+            if (entry and (entry['inode'], entry['size'], entry['mtime']) == (st.st_ino, st.st_size, st.st_mtime)
+                    and payload_intact(file_name, entry)):
+                file_entries[file_name] = entry
+                if on_file_ready:
+                    on_file_ready(file_name)
+            else:
+                stale.append((file_name, path, st))
+        # Results come back in submission order, so files become ready in the order they are read
+        stale.sort()
         
-        # Use cl100k_base encoding (GPT-4 encoding)
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")
-        except:
-            encoding = None
+        # Process the rest, resuming from the previous entry of files that are the same file
+        paths, payload_paths, previous_entries = [], [], []
+        stale_bytes = 0
+        for file_name, path, st in stale:
+            entry = cached_files.get(file_name, {})
+            resumable = (entry.get('inode') == st.st_ino and entry.get('offset', 0) <= st.st_size
+                         and payload_intact(file_name, entry))
+            paths.append(path)
+            payload_paths.append(str(self.get_payload_path(project_dir, file_name)))
+            previous_entries.append(entry if resumable else None)
+            stale_bytes += st.st_size - (entry.get('offset', 0) if resumable else 0)
+        profile = self.get_profile()
+        profiles = itertools.repeat(profile, len(paths))
+        if pool is not None and len(paths) > 1 and stale_bytes >= min_pool_bytes:
+            # Files are already spread over the worker processes; don't add threads on top
+            results = pool.map(functools.partial(update_file_payload, num_threads=1),
+                               paths, payload_paths, profiles, previous_entries)
+        else:
+            results = map(update_file_payload, paths, payload_paths, profiles, previous_entries)
+        for (file_name, _, st), payload_entry in zip(stale, results):
+            file_entries[file_name] = {
+                'inode': st.st_ino,
+                'size': st.st_size,
+                'mtime': st.st_mtime,
+                **payload_entry
+            }
+            if on_file_ready:
+                on_file_ready(file_name)
         
-        for file_path in project_dir.glob("*.jsonl"):
-            # Get file size
-            total_size += file_path.stat().st_size
-            
-            # Estimate tokens if encoding available
-            if encoding:
-                try:
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                        total_tokens += len(encoding.encode(content))
-                except:
-                    pass  # Skip files that can't be read
+        # Drop the payloads of deleted files
+        for file_name in set(cached_files) - set(file_entries):
+            payload_path = self.get_payload_path(project_dir, file_name)
+            payload_path.unlink(missing_ok=True)
+            Path(str(payload_path) + PAYLOAD_LOCK_SUFFIX).unlink(missing_ok=True)
+        
+        # Project totals are sums of the per-file entries
+        total_size = sum(entry['size'] for entry in file_entries.values())
+        total_tokens = sum(entry['tokens'] for entry in file_entries.values())
         
-        # Update cache
+        # Update cache; entries for deleted files are dropped by rebuilding the file map
         if cache is not None:
             cache[project_name] = {
                 'size': total_size,
                 'tokens': total_tokens,
-                'mtime': current_mtime
+                'mtime': self.get_project_mtime(project_dir, files),
+                'files': file_entries
             }
         
         return total_size, total_tokens
     
+    def get_profile(self) -> str:
+        """Return the projection profile in use: --profile, or the mode's default."""
+        return self.args.profile or DEFAULT_PROFILES[self.args.mode]
+    
+    def get_payload_path(self, project_dir: Path, file_name: str) -> Path:
+        """Return where the filtered payload of a project's session file is kept."""
+        return Path(self.args.out_dir) / PAYLOAD_CACHE_DIR / self.get_profile() / project_dir.name / file_name
+    
+    def get_project_dirs(self) -> List[Path]:
+        """Return the project directories under ~/.claude/projects."""
+        return [Path(entry.path) for entry in os.scandir(CLAUDE_PROJECTS_DIR)
+                if entry.is_dir() and entry.name.startswith("-")]
+    
+    def get_project_index(self) -> List[Tuple[str, str, Path]]:
+        """List (friendly name, munged name, directory) of all projects without computing any stats.
+        
+        Ordered like the project table (friendly name, then munged name), so a number means the
+        same project in both.
+        """
+        if not CLAUDE_PROJECTS_DIR.exists():
+            return []
+        index = [(self.get_human_friendly_name(project_dir.name), project_dir.name, project_dir)
+                 for project_dir in self.get_project_dirs()]
+        return sorted(index, key=lambda x: (x[0].lower(), x[1]))
+    
+    def cached_stats_current(self, files: List[Tuple[str, os.stat_result]], entry: Dict[str, Any]) -> bool:
+        """Check whether a project's cached stats still match its files."""
+        cached_files = entry.get('files', {})
+        if len(files) != len(cached_files):
+            return False
+        for path, st in files:
+            cached = cached_files.get(os.path.basename(path))
+            if not cached or (cached['inode'], cached['size'], cached['mtime']) != (st.st_ino, st.st_size, st.st_mtime):
+                return False
+        return True
+    
+    def list_cached_projects(self) -> Tuple[List[Tuple[str, str, Path, int, Optional[int]]], set]:
+        """List all projects from cached stats without computing anything.
+        
+        Also returns the munged names of projects whose stats are stale. Projects that were never
+        counted have None tokens.
+        """
+        if not CLAUDE_PROJECTS_DIR.exists():
+            return [], set()
+        
+        cache = self.load_projects_cache()
+        project_dirs = self.get_project_dirs()
+        self.forget_vanished_projects(cache, project_dirs)
+        with ThreadPoolExecutor(max_workers=STATS_SCAN_THREADS) as pool:
+            scans = list(pool.map(scan_jsonl_files, project_dirs))
+        
+        stats = []
+        stale = set()
+        for project_dir, files in zip(project_dirs, scans):
+            entry = cache.get(project_dir.name)
+            if entry is None or not self.cached_stats_current(files, entry):
+                stale.add(project_dir.name)
+            stats.append((sum(st.st_size for _, st in files), entry['tokens'] if entry else None))
+        return self.make_project_rows(project_dirs, stats), stale
+    
+    def refresh_project_stats(self, project_dirs: List[Path], on_update: Callable[[str, Tuple[int, int]], None],
+                              cancel: threading.Event):
+        """Recompute the stats of the given projects, calling on_update(munged_name, (size, tokens))
+        as each one finishes. Projects not yet started when cancel is set are skipped.
+        """
+        def refresh(project_dir: Path) -> Optional[Tuple[int, int]]:
+            if cancel.is_set():
+                return None
+            cache = self.load_projects_cache(project_dir.name)
+            stats = self.calculate_project_stats(project_dir, cache, token_pool)
+            self.save_projects_cache(cache, [project_dir.name])
+            return stats
+        
+        # Same pools as list_all_projects; each project is saved as soon as it is done
+        with ProcessPoolExecutor(max_workers=STATS_TOKENIZE_WORKERS,
+                                 mp_context=multiprocessing.get_context("spawn")) as token_pool, \
+                ThreadPoolExecutor(max_workers=STATS_SCAN_THREADS) as scan_pool:
+            futures = {scan_pool.submit(refresh, project_dir): project_dir for project_dir in project_dirs}
+            for future in as_completed(futures):
+                stats = future.result()
+                if stats is not None:
+                    on_update(futures[future].name, stats)
+    
     def list_all_projects(self) -> List[Tuple[str, str, Path, int, int]]:
         """List all Claude projects with their human-friendly names, sizes, and token counts."""
         if not CLAUDE_PROJECTS_DIR.exists():
@@ -268,35 +1713,95 @@ class ConversationAnalyzer(ABC):
         
         # Load cache
         cache = self.load_projects_cache()
-        cache_updated = False
+        original_cache = copy.deepcopy(cache)
         
-        projects = []
-        for project_dir in CLAUDE_PROJECTS_DIR.iterdir():
-            if project_dir.is_dir() and project_dir.name.startswith("-"):
-                munged_name = project_dir.name
-                friendly_name = self.get_human_friendly_name(munged_name)
-                
-                # Calculate stats (will use cache if valid)
-                old_cache_size = len(cache)
-                size_bytes, token_count = self.calculate_project_stats(project_dir, cache)
-                if len(cache) > old_cache_size or (munged_name in cache and 
-                    cache[munged_name].get('size') != size_bytes):
-                    cache_updated = True
-                
-                projects.append((friendly_name, munged_name, project_dir, size_bytes, token_count))
+        project_dirs = self.get_project_dirs()
+        
+        if self.args.fast_estimate:
+            # Estimated counts aren't cached; the projects cache only holds exact counts
+            stats = self.estimate_project_stats(project_dirs)
+            return self.make_project_rows(project_dirs, stats)
         
-        # Save cache if updated
-        if cache_updated:
-            self.save_projects_cache(cache)
+        # Scan projects in parallel threads; stale projects share one process pool for tokenizing
+        # (calculate_project_stats uses the cache where valid). Workers are spawned rather than
+        # forked, since forking from the scan threads can deadlock a child on a held lock.
+        with ProcessPoolExecutor(max_workers=STATS_TOKENIZE_WORKERS,
+                                 mp_context=multiprocessing.get_context("spawn")) as token_pool, \
+                ThreadPoolExecutor(max_workers=STATS_SCAN_THREADS) as scan_pool:
+            stats = list(scan_pool.map(
+                lambda project_dir: self.calculate_project_stats(project_dir, cache, token_pool),
+                project_dirs))
         
-        return sorted(projects, key=lambda x: x[0].lower())
+        projects = self.make_project_rows(project_dirs, stats)
+        self.forget_vanished_projects(cache, project_dirs)
+        
+        # Save the projects whose stats changed
+        self.save_projects_cache(cache, [name for name in cache if cache[name] != original_cache.get(name)])
+        
+        return projects
+    
+    def forget_vanished_projects(self, cache: Dict[str, Any], project_dirs: List[Path]):
+        """Drop the cached stats and payload files of projects that are no longer in project_dirs.
+        
+        Covers projects cached under other profiles too, by way of their payload directories.
+        """
+        payload_root = Path(self.args.out_dir) / PAYLOAD_CACHE_DIR
+        cached_names = set(cache)
+        for profile in PROJECTION_PROFILES:
+            try:
+                with os.scandir(payload_root / profile) as entries:
+                    cached_names.update(entry.name for entry in entries if entry.is_dir())
+            except OSError:
+                pass  # No payloads under this profile yet
+        
+        for munged_name in cached_names - {project_dir.name for project_dir in project_dirs}:
+            cache.pop(munged_name, None)
+            self.get_projects_store().delete_project(munged_name)
+            for profile in PROJECTION_PROFILES:
+                shutil.rmtree(payload_root / profile / munged_name, ignore_errors=True)
+    
+    def make_project_rows(self, project_dirs: List[Path],
+                          stats: List[Tuple[int, int]]) -> List[Tuple[str, str, Path, int, int]]:
+        """Combine project directories and their (size, tokens) into listing rows, in index order."""
+        projects = []
+        for project_dir, (size_bytes, token_count) in zip(project_dirs, stats):
+            munged_name = project_dir.name
+            friendly_name = self.get_human_friendly_name(munged_name)
+            projects.append((friendly_name, munged_name, project_dir, size_bytes, token_count))
+        return sorted(projects, key=lambda x: (x[0].lower(), x[1]))
+    
+    def estimate_project_stats(self, project_dirs: List[Path]) -> List[Tuple[int, int]]:
+        """Estimate (size, tokens) for each project from byte counts and a few sampled lines per file."""
+        with ThreadPoolExecutor(max_workers=STATS_SCAN_THREADS) as pool:
+            scans = list(pool.map(scan_jsonl_files, project_dirs))
+            files = [(path, st.st_size) for scan in scans for path, st in scan]
+            samples = dict(zip((path for path, _ in files),
+                               pool.map(lambda file: sample_jsonl_lines(*file), files)))
+        
+        self.token_estimator = TokenEstimator((line for lines in samples.values() for line in lines),
+                                              self.get_profile())
+        return [
+            (sum(st.st_size for _, st in scan),
+             sum(self.token_estimator.estimate_file(st.st_size, samples[path]) for path, st in scan))
+            for scan in scans
+        ]
+    
+    def print_exact_project_stats(self, project_dir: Path, show_costs: bool):
+        """Count the selected project's tokens exactly, after a listing that only estimated them."""
+        cache = self.load_projects_cache(project_dir.name)
+        size_bytes, token_count = self.calculate_project_stats(project_dir, cache)
+        self.save_projects_cache(cache, [project_dir.name])
+        line = f"Exact size: {self.format_file_size(size_bytes)}, {self.format_token_count(token_count)}"
+        if show_costs:
+            line += f" (est. cost ${self.estimate_cost(token_count):.2f})"
+        print(line)
     
     def find_project_by_name(self, name: str) -> Optional[Tuple[str, Path]]:
         """Find a project by human-friendly name or path."""
-        projects = self.list_all_projects()
+        projects = self.get_project_index()
         
         # First try exact match on friendly name (case-insensitive)
-        for friendly_name, munged_name, project_dir, _, _ in projects:
+        for friendly_name, munged_name, project_dir in projects:
             if friendly_name.lower() == name.lower():
                 return (munged_name, project_dir)
         
@@ -317,22 +1822,6 @@ class ConversationAnalyzer(ABC):
             return ["Path might be ambiguous due to consecutive dashes"]
         return []
     
-    def strip_base64_images(self, content: Any) -> Any:
-        """Recursively strip base64 images from content and replace with placeholder."""
-        if isinstance(content, str):
-            # Check if this is a base64 image data URL
-            if content.startswith("data:image/") and ";base64," in content:
-                # Extract the image type for the placeholder message
-                image_type = content.split(";")[0].split("/")[1]
-                return f"[IMAGE: {image_type} removed]"
-            return content
-        elif isinstance(content, list):
-            return [self.strip_base64_images(item) for item in content]
-        elif isinstance(content, dict):
-            return {key: self.strip_base64_images(value) for key, value in content.items()}
-        else:
-            return content
-    
     def check_gemini_cli(self) -> bool:
         """Check if gemini CLI is installed and available."""
         return shutil.which("gemini") is not None
@@ -396,8 +1885,11 @@ class ConversationAnalyzer(ABC):
         
         return None
     
-    def read_jsonl_files(self, project_dir: Path, since_date: Optional[datetime] = None) -> str:
-        """Read and concatenate all JSONL files in the project directory.
+    def read_jsonl_files(self, project_dir: Path, since_date: Optional[datetime] = None) -> Iterator[str]:
+        """Stream the filtered records of all JSONL files in the project directory.
+        
+        Yields one JSON line per record, file by file, so callers can start chunking
+        and dispatching before the whole project has been read.
         
         If since_date is provided, only include:
         - Files created after since_date
@@ -406,17 +1898,18 @@ class ConversationAnalyzer(ABC):
         if not project_dir.exists():
             raise FileNotFoundError(f"Project directory not found: {project_dir}")
         
-        jsonl_files = list(project_dir.glob("*.jsonl"))
+        # The same listing calculate_project_stats works from, so every file read here gets a payload
+        jsonl_files = [(Path(path), stat) for path, stat in scan_jsonl_files(project_dir)]
         if not jsonl_files:
             raise FileNotFoundError(f"No JSONL files found in: {project_dir}")
         
-        all_content = []
         files_to_process = []
+        # Record timestamps are in UTC; a last-run date without a zone is local time, like the file times
+        since_cutoff = since_date.astimezone() if since_date else None
         
         if since_date:
             print(f"\nDifferential update mode: Processing changes since {since_date.isoformat()}")
-            for file_path in jsonl_files:
-                stat = file_path.stat()
+            for file_path, stat in jsonl_files:
                 # Include if created after last run
                 if datetime.fromtimestamp(stat.st_ctime) > since_date:
                     files_to_process.append((file_path, "new"))
@@ -426,382 +1919,706 @@ class ConversationAnalyzer(ABC):
             
             if not files_to_process:
                 print("No new or modified files since last run.")
-                return ""
+                return
             
             print(f"Found {len([f for f, t in files_to_process if t == 'new'])} new files and "
                   f"{len([f for f, t in files_to_process if t == 'partial'])} modified files")
         else:
-            files_to_process = [(f, "all") for f in jsonl_files]
+            files_to_process = [(f, "all") for f, _ in jsonl_files]
             print(f"\nFull analysis mode: Reading {len(jsonl_files)} JSONL files...")
         
-        for file_path, process_type in tqdm(sorted(files_to_process), desc="Files", unit="file"):
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-                
-                # For partial files, pre-filter lines by timestamp
-                if process_type == "partial" and since_date:
-                    filtered_lines = []
-                    for line in lines:
-                        if line.strip():
-                            try:
+        # Bring the payload files up to date (a no-op when the project listing just did it), one
+        # file per worker process. Payloads are streamed in sorted file order as soon as each is
+        # ready, so chunking starts while later files are still being filtered.
+        ready = set()
+        ready_changed = threading.Condition()
+        
+        def mark_ready(file_name: str):
+            with ready_changed:
+                ready.add(file_name)
+                ready_changed.notify_all()
+        
+        def update_payloads() -> Dict[str, Any]:
+            cache = self.load_projects_cache(project_dir.name)
+            original_cache = copy.deepcopy(cache)
+            self.calculate_project_stats(project_dir, cache, ingest_pool, on_file_ready=mark_ready,
+                                         min_pool_bytes=INGEST_POOL_MIN_BYTES)
+            if cache != original_cache:
+                self.save_projects_cache(cache, [project_dir.name])
+            return cache
+        
+        def notify_done(_future):
+            # Wake the reader when the update ends, so a failure or a file it never got to can't strand it
+            with ready_changed:
+                ready_changed.notify_all()
+        
+        with self.create_ingest_pool() as ingest_pool, ThreadPoolExecutor(max_workers=1) as updater:
+            update = updater.submit(update_payloads)
+            update.add_done_callback(notify_done)
+            try:
+                # Stream from the filtered payload files (see calculate_project_stats), so each record is
+                # parsed and filtered only once across the project listing and any number of runs
+                for file_path, process_type in tqdm(sorted(files_to_process), desc="Files", unit="file", leave=False):
+                    with ready_changed:
+                        ready_changed.wait_for(lambda: file_path.name in ready or update.done())
+                    if file_path.name not in ready:
+                        update.result()  # Raises the worker's error, if that's why the file isn't ready
+                        continue  # The file vanished before it could be filtered
+                    payload_path = self.get_payload_path(project_dir, file_path.name)
+                    if not payload_path.exists():
+                        continue  # The session file couldn't be read
+                    # Iterate the file lazily rather than readlines() so a single huge
+                    # session file never has to sit in memory in full
+                    with open(payload_path, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            # Stop short of a line another process is still appending
+                            if not line.endswith('\n'):
+                                break
+                            line = line.rstrip('\n')
+                            
+                            # For partial files, only keep lines newer than the last run
+                            if process_type == "partial" and since_date:
                                 data = json.loads(line)
                                 if 'timestamp' in data:
-                                    timestamp = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-                                    if timestamp > since_date:
-                                        filtered_lines.append(line)
-                                else:
-                                    # Include lines without timestamps in partial mode
-                                    filtered_lines.append(line)
-                            except (json.JSONDecodeError, ValueError):
-                                pass
-                    lines = filtered_lines
-                    
-                    if not lines:
-                        continue  # Skip if no new lines in this file
-                
-                for line in tqdm(lines, desc=f"Processing {file_path.name}", unit="line", leave=False):
-                    if line.strip():
-                        try:
-                            data = json.loads(line)
-                            # Filter to keep only essential fields
-                            filtered_data = {}
-                            
-                            # Always keep these fields if they exist
-                            if 'message' in data:
-                                filtered_data['message'] = self.strip_base64_images(data['message'])
-                            if 'timestamp' in data:
-                                filtered_data['timestamp'] = data['timestamp']
-                            if 'children' in data:
-                                filtered_data['children'] = self.strip_base64_images(data['children'])
-                            
-                            # Keep type to understand the structure
-                            if 'type' in data:
-                                filtered_data['type'] = data['type']
-                            
-                            # Strip images from toolUseResult if present
-                            if 'toolUseResult' in data:
-                                filtered_data['toolUseResult'] = self.strip_base64_images(data['toolUseResult'])
+                                    try:
+                                        timestamp = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
+                                    except ValueError:
+                                        continue
+                                    if timestamp <= since_cutoff:
+                                        continue
                             
-                            # Only add if we have meaningful content
-                            if filtered_data and ('message' in filtered_data or 'type' in filtered_data):
-                                all_content.append(json.dumps(filtered_data))
-                        except json.JSONDecodeError:
-                            pass  # Silently skip invalid lines
-        
-        return "\n".join(all_content)
-    
-    def chunk_content(self, content: str, max_chunk_size: int = 1024 * 1024) -> List[str]:
-        """Split content into chunks smaller than max_chunk_size, respecting line boundaries."""
-        lines = content.split('\n')
-        chunks = []
-        current_chunk = []
-        current_size = 0
+                            yield line
+                cache = update.result()
+            except BaseException:
+                # Reading stopped early (error, Ctrl-C, or the caller closed the stream); don't
+                # leave the workers filtering files nobody will read
+                if ingest_pool is not None:
+                    ingest_pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        
+        # Tally the binary payloads stripped from the files being sent, for the run summary; these are
+        # per-file totals, so they only match what was sent when every file was sent in full
+        self._stripped_whole_files = all(process_type != "partial" for _, process_type in files_to_process)
+        file_entries = cache.get(project_dir.name, {}).get('files', {})
+        self._stripped_blocks = sum(file_entries.get(f.name, {}).get('stripped_blocks', 0) for f, _ in files_to_process)
+        self._stripped_bytes = sum(file_entries.get(f.name, {}).get('stripped_bytes', 0) for f, _ in files_to_process)
+    
+    def create_ingest_pool(self):
+        """Return a context manager giving the process pool that filters session files, or None for in-process.
+        
+        Workers are spawned rather than forked, like the project listing's, since other threads are running.
+        """
+        workers = self.args.ingest_workers
+        if workers is not None and workers <= 1:
+            return nullcontext(None)
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    
+    def get_request_overhead_tokens(self) -> int:
+        """Tokens each map request needs besides the chunk: system prompt, preamble and the report."""
+        prompt_tokens = count_tokens(self.get_analysis_prompt())
+        preamble_tokens = count_tokens(self.get_chunk_preamble(999_999, 999_999))
+        return prompt_tokens + preamble_tokens + NOMINAL_REPORT_TOKEN_COUNT
+    
+    def get_chunk_token_budget(self) -> int:
+        """Return how many tokens of conversation fit in one chunk for the current model."""
+        request_budget = self.args.request_tokens or REQUEST_TOKEN_BUDGETS.get(GEMINI_MODEL, DEFAULT_REQUEST_TOKEN_BUDGET)
+        request_budget = min(request_budget, MODEL_CONTEXT_TOKENS.get(GEMINI_MODEL, DEFAULT_CONTEXT_TOKENS))
+        chunk_budget = request_budget - self.get_request_overhead_tokens()
+        if chunk_budget <= 0:
+            raise ValueError(f"Request budget of {request_budget:,} tokens leaves no room for conversation content")
+        return chunk_budget
+    
+    def check_chunk_fits(self, chunk_num: int, chunk_tokens: int):
+        """Refuse to dispatch a chunk that can't fit in the model's context window."""
+        context_tokens = MODEL_CONTEXT_TOKENS.get(GEMINI_MODEL, DEFAULT_CONTEXT_TOKENS)
+        needed = chunk_tokens + self.get_request_overhead_tokens()
+        if needed > context_tokens:
+            raise ValueError(f"Chunk {chunk_num} needs {needed:,} tokens, more than the "
+                             f"{context_tokens:,} token context of {GEMINI_MODEL}")
+    
+    def truncate_to_tokens(self, line: str, max_tokens: int) -> str:
+        """Cut a single oversized record down to max_tokens, marking what was dropped."""
+        encoding = get_encoding()
+        if encoding is None:
+            kept = line[:max_tokens * CHARS_PER_TOKEN]
+            return f"{kept} [... {len(line) - len(kept)} characters truncated]"
+        tokens = encoding.encode_ordinary(line)
+        return f"{encoding.decode(tokens[:max_tokens])} [... {len(tokens) - max_tokens} tokens truncated]"
+    
+    def chunk_content(self, lines: Iterable[str], max_chunk_tokens: Optional[int] = None) -> Iterator[Tuple[str, int]]:
+        """Group lines into chunks of at most max_chunk_tokens, cutting each chunk as soon as it is full.
         
-        print(f"\nChunking {len(lines)} lines into ~{max_chunk_size/(1024*1024):.1f}MB chunks...")
+        Yields (chunk, token_count) pairs. Defaults to the current model's chunk budget.
+        """
+        if max_chunk_tokens is None:
+            max_chunk_tokens = self.get_chunk_token_budget()
+        # Leave a little headroom for the marker added to truncated records
+        max_line_tokens = max_chunk_tokens - 32
+        current_chunk = []
+        current_tokens = 0
         
-        for line in tqdm(lines, desc="Chunking", unit="line"):
-            line_size = len(line.encode('utf-8')) + 1  # +1 for newline
+        # Count lines in batches so the tokenizer can work on several at once
+        lines = iter(lines)
+        batches = iter(lambda: list(itertools.islice(lines, TOKENIZE_BATCH_LINES)), [])
+        for line, line_tokens in ((line, count + 1)  # +1 for newline
+                                  for batch in batches for line, count in zip(batch, count_tokens_batch(batch))):
+            if line_tokens > max_line_tokens:
+                # A single record bigger than a whole chunk (e.g. a giant tool output)
+                print(f"\nWarning: truncating a {line_tokens:,} token record to fit the {max_chunk_tokens:,} token chunk budget")
+                line = self.truncate_to_tokens(line, max_line_tokens)
+                line_tokens = count_tokens(line) + 1
             
-            # If adding this line would exceed the limit, save current chunk
-            if current_size + line_size > max_chunk_size and current_chunk:
-                chunks.append('\n'.join(current_chunk))
+            # If adding this line would exceed the limit, hand off the current chunk
+            if current_tokens + line_tokens > max_chunk_tokens and current_chunk:
+                yield '\n'.join(current_chunk), current_tokens
                 current_chunk = []
-                current_size = 0
+                current_tokens = 0
             
             # Add line to current chunk
             current_chunk.append(line)
-            current_size += line_size
+            current_tokens += line_tokens
         
         # Don't forget the last chunk
         if current_chunk:
-            chunks.append('\n'.join(current_chunk))
+            yield '\n'.join(current_chunk), current_tokens
+    
+    def prefetch_chunks(self, chunks: Iterator[Tuple[str, int]], depth: int = 1) -> Iterator[Tuple[str, int]]:
+        """Build chunks on a background thread while earlier chunks are being analyzed.
+        
+        At most `depth` finished chunks wait in the queue, so memory stays bounded
+        by the chunks in flight rather than by the size of the project.
+        """
+        chunk_queue = queue.Queue(maxsize=max(1, depth))
+        stop = threading.Event()
+        done = object()
         
-        return chunks
+        def produce():
+            try:
+                for chunk in chunks:
+                    while not stop.is_set():
+                        try:
+                            chunk_queue.put(chunk, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+                chunk_queue.put(done)
+            except BaseException as e:
+                # Hand reader errors (missing files etc.) over to the consumer
+                chunk_queue.put(e)
+        
+        producer = threading.Thread(target=produce, name="chunk-producer", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
     
+    def get_chunk_preamble(self, chunk_num: int, total_chunks: Optional[int]) -> str:
+        """Return the instruction line that precedes each chunk."""
+        # With streaming ingestion the chunk count is unknown until the last file is read
+        position = f"chunk {chunk_num} of {total_chunks}" if total_chunks else f"chunk {chunk_num}"
+        return f"This is {position}. Analyze this portion of the conversation:\n\n"
     
-    def run_analysis_with_gemini_cli(self, system_prompt: str, input_text: str, attempt: int) -> tuple[SubProcessExecutionResult,int]:
+    def get_map_jobs(self) -> int:
+        """Return how many chunk analyses (API requests or gemini processes) may run at the same time."""
+        return max(1, self.args.jobs)
     
-        GEMINI_CLI_CMD = ["gemini", "-m", "gemini-2.5-flash", "-p", system_prompt]
-        print(f"\n[blue]═══ Gemini CLI Call (Attempt {attempt + 1}/{MAX_RETRIES}) ═══[/blue]", flush=True)
-        print(f"[dim]Command: {' '.join(GEMINI_CLI_CMD)}[/dim]", flush=True)
-        print(f"[dim]Input length: {len(input_text)} characters[/dim]", flush=True)
+    def analyze_chunks(self, chunks: Iterator[Tuple[str, int]], use_cli: bool, desc: str = "Analyzing chunks",
+                       on_subreport: Optional[Callable[[int, str], Optional[Path]]] = None,
+                       manifest: Optional["RunManifest"] = None) -> List[str]:
+        """Run the map phase over a stream of (chunk, token_count) pairs and return subreports in chunk order.
         
-        try:
-            # Create a clean environment without GOOGLE_APPLICATION_CREDENTIALS which overrides our 
-            # 'normal' Google Login credentials -- and we miss out on the goodie bag that comes with that tier
-            # This took hours to figure out. It shouldn't have. 
-            clean_env = os.environ.copy()
-            clean_env.pop("GOOGLE_APPLICATION_CREDENTIALS", None)            
-            print(f"[dim]Environment has {len(clean_env)} vars (removed GOOGLE_APPLICATION_CREDENTIALS)[/dim]", flush=True)
-
-            # Always good to catch performance data. 
-            start_time = time.time()
-            
-            # Use Popen for real-time output -- incredibly hard to figure out what goes on 
-            # when running the gemini CLI command otherwise. It becomes an impenetrable black box
-            # that causes you hours of misery. Don't repeat my mistakes: Popen is your friend!
-            proc = subprocess.Popen(
-                GEMINI_CLI_CMD, 
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                env=clean_env,
-                bufsize=1,  # Line buffered
-                universal_newlines=True
-            )
-            
-            # Write input and close stdin
-            print("--- Writing input to subprocess stdin ---", flush=True)
-            proc.stdin.write(input_text)
-            proc.stdin.close()
-            
-            print("\n--- Subprocess output (real-time) ---", flush=True)
-            
-            # All processes produce output in two places: "standard out" and "standard error"
-            # We just merge them. 
-            output_lines = []
-            error_lines = []
-            
-            def read_stream(stream, lines, prefix):
-                # inline / local functions are pythonic apparently. But in an inner loop? 🤔
-                for line in stream:
-                    print(f"[{prefix}]: {line}", end='', flush=True)
-                    lines.append(line)
-            
-            # Start threads for reading
-            stdout_thread = threading.Thread(target=read_stream, args=(proc.stdout, output_lines, "stdout"))
-            stderr_thread = threading.Thread(target=read_stream, args=(proc.stderr, error_lines, "stderr"))
-            
-            stdout_thread.start()
-            stderr_thread.start()
-            
-            # Wait FOREVER 🧙‍♂️ for process to complete
-            return_code = proc.wait()
+        Up to get_map_jobs() chunks are analyzed concurrently on a thread pool. A new chunk is
+        only pulled from the stream when a worker frees up, so at most that many chunks are in
+        memory. on_subreport is called on this thread as each chunk completes, in completion
+        order, and returns where the subreport was saved. With a manifest, chunks it already
+        lists as done are read back instead of analyzed, and progress is checkpointed to it.
+        """
+        jobs = self.get_map_jobs()
+        results: Dict[int, str] = {}
+        chunk_hashes: Dict[int, str] = {}
+        total_tokens = 0
+        resumed = 0
+        
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="chunk") as executor, \
+                tqdm(desc=desc, unit="chunk") as pbar:
+            in_flight: Dict[Future, int] = {}
             
-            # Wait for threads to finish reading
-            stdout_thread.join()
-            stderr_thread.join()
+            def finish(i: int, subreport: str):
+                subreport_path = on_subreport(i, subreport) if on_subreport else None
+                if manifest:
+                    manifest.record_chunk(i, chunk_hashes[i], "done", subreport_path)
+                results[i] = subreport
+                pbar.update(1)
             
-            elapsed_time = time.time() - start_time
+            def collect(return_when):
+                done, _ = wait(in_flight, return_when=return_when)
+                for future in done:
+                    i = in_flight.pop(future)
+                    finish(i, future.result())
+                pbar.set_description(f"{desc} ({len(in_flight)} in flight)")
             
-            print(f"\n--- Process completed with exit code: {return_code} ---", flush=True)
-            print(f"Output length: {len(''.join(output_lines))} chars", flush=True)
-            print(f"Processing time: {elapsed_time:.2f}")
-
-            result = SubProcessExecutionResult(return_code, ''.join(output_lines), ''.join(error_lines))
- 
-    
-    def analyze_chunk_with_gemini_cli(self, content: str, chunk_num: int, total_chunks: int) -> str:
-        """Analyze a chunk using Gemini CLI."""
-        print(f"\n[ENTER] analyze_chunk_with_gemini_cli for chunk {chunk_num}/{total_chunks}", flush=True)
-        
-        system_prompt = self.get_analysis_prompt()
-        for attempt in range(MAX_RETRIES):
             try:
-                # Prepare the full prompt content
-                input = f"This is chunk {chunk_num} of {total_chunks}. Analyze this portion of the conversation:\n\n{content}"
-                result, execution_time_in_millis = self.run_analysis_with_gemini_cli(system_prompt, input, attempt)
-                
-                return result.stdout
-            except subprocess.TimeoutExpired as e:
-                # Check if it's actually a rate limit disguised as a timeout
-                stderr_text = ""
-                if hasattr(e, 'stderr') and e.stderr:
-                    stderr_text = e.stderr.decode('utf-8') if isinstance(e.stderr, bytes) else str(e.stderr)
+                for i, (chunk, chunk_tokens) in enumerate(chunks, 1):
+                    total_tokens += chunk_tokens
+                    chunk_hashes[i] = hashlib.sha256(chunk.encode('utf-8')).hexdigest()
                     
-                is_rate_limit = "429" in stderr_text or "RESOURCE_EXHAUSTED" in stderr_text or "Quota exceeded" in stderr_text
-                
-                if is_rate_limit:
-                    print(f"\n[yellow]Gemini CLI hit rate limit (detected in timeout).[/yellow]")
-                    if "Gemini 2.5 Pro" in stderr_text and not self._gemini_model_override_active:
-                        self._gemini_model_override_active = True
-                        print(f"[yellow]Switching from Pro to Flash model due to quota limits.[/yellow]")
-                else:
-                    print(f"\n[yellow]Gemini CLI timed out after {GEMINI_CLI_TIMEOUT} seconds.[/yellow]")
-                
-                # Show the command that timed out
-                print(f"[dim]Command: {' '.join(cmd)}[/dim]")
-                print(f"[dim]Attempt {attempt + 1}/{MAX_RETRIES}[/dim]")
-                
-                # Show partial stderr if available
-                if stderr_text:
-                    # Extract the most relevant error message
-                    if "message" in stderr_text:
-                        try:
-                            import re
-                            match = re.search(r'"message":\s*"([^"]+)"', stderr_text)
-                            if match:
-                                print(f"[red]Error: {match.group(1)}[/red]")
-                        except:
-                            pass
-                    else:
-                        print(f"[dim]Partial error: {stderr_text[:300]}...[/dim]")
-                
-                wait_time = INITIAL_BACKOFF_SECONDS * (2 ** attempt)
-                print(f"\nRetrying in {wait_time:.1f} seconds...")
-                time.sleep(wait_time)
-            except subprocess.CalledProcessError as e:
-                if "429" in e.stderr or "RESOURCE_EXHAUSTED" in e.stderr:
-                    if not self._gemini_model_override_active:
-                        self._gemini_model_override_active = True
-                        print("\n[yellow]Rate limit hit. Switching to 'gemini-2.5-flash' model for subsequent calls.[/yellow]")
-                    wait_time = INITIAL_BACKOFF_SECONDS * (2 ** attempt)
-                    print(f"\nGemini CLI rate limit hit (429). Retrying in {wait_time:.1f} seconds... (Attempt {attempt + 1}/{MAX_RETRIES})")
-                    time.sleep(wait_time)
-                else:
-                    print(f"\n[red]Gemini CLI error:[/red]")
-                    print(f"[red]Exit code: {e.returncode}[/red]")
-                    print(f"[red]Error output:[/red]\n{e.stderr}")
-                    raise RuntimeError(f"Gemini CLI failed: {e.stderr}")
-
-        raise RuntimeError(f"Gemini CLI failed after {MAX_RETRIES} attempts due to rate limiting.")
+                    if manifest:
+                        previous = manifest.completed_subreport(i, chunk_hashes[i])
+                        if previous is not None:
+                            resumed += 1
+                            finish(i, previous)
+                            continue
+                        manifest.record_chunk(i, chunk_hashes[i], "pending")
+                    
+                    self.check_chunk_fits(i, chunk_tokens)
+                    pbar.set_description(f"{desc}: chunk {i} ({self.format_token_count(chunk_tokens)})")
+                    
+                    in_flight[executor.submit(self.analyze_chunk_with_gemini, chunk, i, None, use_cli)] = i
+                    if len(in_flight) >= jobs:
+                        collect(FIRST_COMPLETED)
+                while in_flight:
+                    collect(ALL_COMPLETED)
+            except BaseException:
+                # Don't start queued chunks once one has failed, and don't wait
+                # for running gemini processes before unwinding
+                self.abort_in_flight()
+                for future in in_flight:
+                    future.cancel()
+                raise
+        
+        if resumed:
+            print(f"\nResumed {resumed} chunks from the previous run's checkpoint.")
+        print(f"\nTotal content size: {self.format_token_count(total_tokens)} in {len(results)} chunks")
+        return [results[i] for i in sorted(results)]
     
-    def analyze_chunk_with_gemini(self, content: str, chunk_num: int, total_chunks: int, use_cli: bool = False) -> str:
-        """Send a chunk to Gemini for analysis."""
-        if use_cli:
-            result = self.analyze_chunk_with_gemini_cli(content, chunk_num, total_chunks)
-            time.sleep(1) # Rate limit to 60 requests/minute
-            return result
+    def abort_in_flight(self):
+        """Stop starting or retrying calls and kill any running gemini processes."""
+        self._shutdown.set()
+        with self._print_lock:
+            procs = list(self._active_procs)
+        for proc in procs:
+            self.kill_process_group(proc)
+    
+    
+    def run_analysis_with_gemini_cli(self, system_prompt: str, input_text: str, attempt: int) -> tuple[SubProcessExecutionResult,int]:
+        """Run one gemini CLI call with input_text on stdin.
         
-        client = self.get_gemini_client()
-        prompt = self.get_analysis_prompt()
+        Returns the captured result and the elapsed time in milliseconds, and raises
+        CalledProcessError on a non-zero exit. Several worker threads may call this at once:
+        with a single job the output streams live, otherwise each call buffers its console
+        output and prints it as one block when its process exits.
+        """
+        GEMINI_CLI_CMD = ["gemini", "-m", GEMINI_MODEL, "-p", system_prompt]
+        stream_live = self.get_map_jobs() == 1
+        call_id = next(self._cli_call_ids)
+        log_lines = []
+        
+        def log(text: str):
+            if stream_live:
+                print(text, flush=True)
+            else:
+                log_lines.append(text)
+        
+        log(f"\n[blue]═══ Gemini CLI Call #{call_id} (Attempt {attempt + 1}/{MAX_RETRIES}) ═══[/blue]")
+        log(f"[dim]Command: {' '.join(GEMINI_CLI_CMD)}[/dim]")
+        log(f"[dim]Input length: {len(input_text)} characters[/dim]")
+        
+        # Create a clean environment without GOOGLE_APPLICATION_CREDENTIALS which overrides our 
+        # 'normal' Google Login credentials -- and we miss out on the goodie bag that comes with that tier
+        # This took hours to figure out. It shouldn't have. 
+        clean_env = os.environ.copy()
+        clean_env.pop("GOOGLE_APPLICATION_CREDENTIALS", None)            
+        log(f"[dim]Environment has {len(clean_env)} vars (removed GOOGLE_APPLICATION_CREDENTIALS)[/dim]")
+
+        # Every attempt is a request against the CLI's quota, retries included
+        self.wait_for_rate_limit(True, system_prompt, input_text)
+        if self._shutdown.is_set():
+            raise FatalError("Run interrupted")
+        
+        # Always good to catch performance data. 
+        start_time = time.time()
         
-        response = client.chat.completions.create(
-            model=GEMINI_MODEL,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": f"This is chunk {chunk_num} of {total_chunks}. Analyze this portion of the conversation:\n\n{content}"}
-            ],
-            temperature=0.0
+        # Use Popen for real-time output -- incredibly hard to figure out what goes on 
+        # when running the gemini CLI command otherwise. It becomes an impenetrable black box
+        # that causes you hours of misery. Don't repeat my mistakes: Popen is your friend!
+        proc = subprocess.Popen(
+            GEMINI_CLI_CMD, 
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=clean_env,
+            bufsize=1,  # Line buffered
+            universal_newlines=True,
+            start_new_session=True  # Own process group, so the watchdog can kill node and its children
         )
-        time.sleep(1) # Rate limit to 60 requests/minute
-        return response.choices[0].message.content or ""
+        with self._print_lock:
+            self._active_procs.add(proc)
+        
+        # All processes produce output in two places: "standard out" and "standard error".
+        # Each call keeps its own copy so parallel calls never mix their output.
+        output_lines = []
+        error_lines = []
+        last_output = [time.monotonic()]  # Touched by the readers, watched by the stall check
+        
+        def read_stream(stream, lines, prefix):
+            for line in stream:
+                last_output[0] = time.monotonic()
+                if stream_live:
+                    print(f"[{prefix}]: {line}", end='', flush=True)
+                lines.append(line)
+        
+        def write_input():
+            try:
+                proc.stdin.write(input_text)
+                proc.stdin.close()
+            except (BrokenPipeError, ValueError, OSError):
+                pass  # Process exited or was killed early; its exit code and stderr tell the story
+        
+        # Readers start before the writer so a chatty process can't fill its output pipe and
+        # deadlock against our write; the writer has its own thread so a process that never
+        # reads stdin can't block us before the watchdog is running
+        stdout_thread = threading.Thread(target=read_stream, args=(proc.stdout, output_lines, "stdout"))
+        stderr_thread = threading.Thread(target=read_stream, args=(proc.stderr, error_lines, "stderr"))
+        stdin_thread = threading.Thread(target=write_input)
+        stdout_thread.start()
+        stderr_thread.start()
+        log("--- Writing input to subprocess stdin ---")
+        stdin_thread.start()
+        
+        if stream_live:
+            print("\n--- Subprocess output (real-time) ---", flush=True)
+        
+        # No more waiting FOREVER 🧙‍♂️: a watchdog enforces a total deadline and a no-output deadline
+        deadline = time.monotonic() + self.args.cli_timeout
+        timeout_reason = None
+        while True:
+            try:
+                return_code = proc.wait(timeout=WATCHDOG_POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                now = time.monotonic()
+                if now > deadline:
+                    timeout_reason = f"exceeded the {self.args.cli_timeout}s deadline"
+                elif now - last_output[0] > self.args.cli_stall_timeout:
+                    timeout_reason = f"produced no output for {self.args.cli_stall_timeout}s"
+                if timeout_reason:
+                    self.kill_process_group(proc)
+                    return_code = proc.wait()
+                    break
+        
+        # Wait for threads to finish reading
+        stdin_thread.join()
+        stdout_thread.join()
+        stderr_thread.join()
+        with self._print_lock:
+            self._active_procs.discard(proc)
+        
+        elapsed_time = time.time() - start_time
+        self.record_latency("cli", elapsed_time)
+        
+        if timeout_reason:
+            log(f"\n--- Process #{call_id} killed: {timeout_reason} ---")
+        log(f"\n--- Process #{call_id} completed with exit code: {return_code} ---")
+        log(f"Output length: {len(''.join(output_lines))} chars")
+        log(f"Processing time: {elapsed_time:.2f}")
+        
+        if not stream_live:
+            # One block per call, stderr included, so concurrent calls stay readable
+            with self._print_lock:
+                print("\n".join(log_lines), flush=True)
+                for line in error_lines:
+                    print(f"[stderr #{call_id}]: {line}", end='', flush=True)
+        
+        result = SubProcessExecutionResult(return_code, ''.join(output_lines), ''.join(error_lines))
+        if timeout_reason:
+            raise GeminiTimeoutError(f"Gemini CLI call #{call_id} {timeout_reason} after {elapsed_time:.0f}s")
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, GEMINI_CLI_CMD, result.stdout, result.stderr)
+        return result, int(elapsed_time * 1000)
     
-    def consolidate_reports_with_cli(self, subreports: List[str]) -> str:
-        """Consolidate reports using Gemini CLI."""
-
-        # TODO we need to keep an eye on the input length of the subreports -- the consolidated output can't be > max output tokens (which in some LLMs is very limited)
-        combined_content = "\n\n---SUBREPORT BOUNDARY---\n\n".join(subreports)
-        system_prompt = self.get_consolidation_prompt()
+    def kill_process_group(self, proc: subprocess.Popen):
+        """Kill a gemini process together with any children it spawned."""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+        except (ProcessLookupError, PermissionError):
+            pass  # Already gone
+    
+    def record_latency(self, backend: str, seconds: float):
+        """Remember how long one call took so timeouts can be tuned from real numbers."""
+        with self._print_lock:
+            self._call_latencies.setdefault(backend, []).append(seconds)
+    
+    def call_gemini(self, system_prompt: str, user_content: str, use_cli: bool, description: str) -> str:
+        """Send one prompt to the chosen backend, retrying the failures that are worth retrying.
         
+        Every failure is classified first. Auth, quota and fatal errors are raised straight
+        away; rate limits, timeouts and transient errors back off with jitter, honoring any
+        retry delay the server asked for, up to MAX_RETRIES attempts.
+        """
         for attempt in range(MAX_RETRIES):
             try:
-                # Use the logging wrapper - pass content directly via stdin
-                result, elapsed_time_in_millis = self.run_analysis_with_gemini_cli(system_prompt, combined_content, attempt)
-                
-                return result.stdout
-            except subprocess.TimeoutExpired as e:
-                # Check if it's actually a rate limit disguised as a timeout
-                stderr_text = ""
-                if hasattr(e, 'stderr') and e.stderr:
-                    stderr_text = e.stderr.decode('utf-8') if isinstance(e.stderr, bytes) else str(e.stderr)
-                    
-                is_rate_limit = "429" in stderr_text or "RESOURCE_EXHAUSTED" in stderr_text or "Quota exceeded" in stderr_text
-                
-                if is_rate_limit:
-                    print(f"\n[yellow]Gemini CLI hit rate limit (detected in timeout).[/yellow]")
-                    if "Gemini 2.5 Pro" in stderr_text and not self._gemini_model_override_active:
-                        self._gemini_model_override_active = True
-                        print(f"[yellow]Switching from Pro to Flash model due to quota limits.[/yellow]")
-                else:
-                    print(f"\n[yellow]Gemini CLI timed out after {GEMINI_CLI_TIMEOUT} seconds.[/yellow]")
-                
-                # Show the command that timed out
-                print(f"[dim]Command: {' '.join(cmd)}[/dim]")
-                print(f"[dim]Attempt {attempt + 1}/{MAX_RETRIES}[/dim]")
-                
-                # Show partial stderr if available
-                if stderr_text:
-                    # Extract the most relevant error message
-                    if "message" in stderr_text:
-                        try:
-                            import re
-                            match = re.search(r'"message":\s*"([^"]+)"', stderr_text)
-                            if match:
-                                print(f"[red]Error: {match.group(1)}[/red]")
-                        except:
-                            pass
-                    else:
-                        print(f"[dim]Partial error: {stderr_text[:300]}...[/dim]")
+                if use_cli:
+                    result, _ = self.run_analysis_with_gemini_cli(system_prompt, user_content, attempt)
+                    return result.stdout
+                return self.complete_with_api(system_prompt, user_content)
+            except Exception as e:
+                if self._shutdown.is_set():
+                    raise FatalError("Run interrupted") from e
+                error = classify_gemini_error(e)
+                if not error.retryable:
+                    raise error from e
+                if attempt == MAX_RETRIES - 1:
+                    raise type(error)(f"{error} (gave up after {MAX_RETRIES} attempts)",
+                                      retry_after=error.retry_after) from e
                 
-                wait_time = INITIAL_BACKOFF_SECONDS * (2 ** attempt)
-                print(f"\nRetrying in {wait_time:.1f} seconds...")
-                time.sleep(wait_time)
-            except subprocess.CalledProcessError as e:
-                if "429" in e.stderr or "RESOURCE_EXHAUSTED" in e.stderr:
-                    if not self._gemini_model_override_active:
-                        self._gemini_model_override_active = True
-                        print("\n[yellow]Rate limit hit. Switching to 'gemini-2.5-flash' model for subsequent calls.[/yellow]")
-                    wait_time = INITIAL_BACKOFF_SECONDS * (2 ** attempt)
-                    print(f"\nGemini CLI rate limit hit (429). Retrying in {wait_time:.1f} seconds... (Attempt {attempt + 1}/{MAX_RETRIES})")
-                    time.sleep(wait_time)
-                else:
-                    print(f"\n[red]Gemini CLI error:[/red]")
-                    print(f"[red]Exit code: {e.returncode}[/red]")
-                    print(f"[red]Error output:[/red]\n{e.stderr}")
-                    raise RuntimeError(f"Gemini CLI failed: {e.stderr}")
-        
-        raise RuntimeError(f"Gemini CLI failed after {MAX_RETRIES} attempts due to rate limiting.")
+                wait_time = get_backoff_seconds(attempt, error.retry_after)
+                if isinstance(error, RateLimitError):
+                    # Everyone sharing this quota has to back off, not just this worker
+                    self.get_rate_limiter(use_cli).pause(wait_time)
+                print(f"\n[yellow]{description}: {error.kind} error: {error}[/yellow]")
+                print(f"Retrying in {wait_time:.1f} seconds... (Attempt {attempt + 1}/{MAX_RETRIES})")
+                # Wait on the shutdown event, so Ctrl-C doesn't have to sit out the backoff
+                if self._shutdown.wait(wait_time):
+                    raise FatalError("Run interrupted") from e
     
-    def consolidate_reports(self, subreports: List[str], use_cli: bool = False) -> str:
-        """Consolidate multiple subreports into a final report."""
-        if use_cli:
-            result = self.consolidate_reports_with_cli(subreports)
-            time.sleep(1) # Rate limit to 60 requests/minute
-            return result
-        
-        client = self.get_gemini_client()
-        prompt = self.get_consolidation_prompt()
+    def get_chunk_cache(self) -> Optional[ChunkCache]:
+        """Get the chunk response cache for this run, or None if caching is disabled."""
+        if self.args.no_cache:
+            return None
+        with self._client_lock:
+            if self._chunk_cache is None:
+                self._chunk_cache = ChunkCache(Path(self.args.out_dir) / CHUNK_CACHE_DIR)
+            return self._chunk_cache
+    
+    def analyze_chunk_with_gemini(self, content: str, chunk_num: int, total_chunks: Optional[int], use_cli: bool = False) -> str:
+        """Send a chunk to Gemini for analysis, reusing a cached response for identical input."""
+        prompt = self.get_analysis_prompt()
+        cache = self.get_chunk_cache()
+        if cache:
+            # The chunk preamble is left out of the key so a different chunk count
+            # doesn't invalidate every entry
+            cache_key = ChunkCache.make_key("cli" if use_cli else "api", GEMINI_MODEL, prompt, content)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
         
-        # Combine all subreports
-        combined_content = "\n\n---SUBREPORT BOUNDARY---\n\n".join(subreports)
+        response = self.call_gemini(prompt, f"{self.get_chunk_preamble(chunk_num, total_chunks)}{content}",
+                                    use_cli, f"chunk {chunk_num}")
+        if cache and response.strip():
+            cache.put(cache_key, response)
+        return response
+    
+    def group_reports_by_budget(self, reports: List[str], budget: int) -> List[List[str]]:
+        """Split reports, in order, into groups whose combined token count fits the budget.
         
-        print("\nConsolidating subreports into final report...")
+        Every group takes at least two reports so each level of the tree shrinks; since a
+        report is bounded by the model's output limit, so is an over-budget pair.
+        """
+        groups = []
+        current_group = []
+        current_tokens = 0
+        for report, report_tokens in zip(reports, count_tokens_batch(reports)):
+            if current_tokens + report_tokens > budget and len(current_group) >= 2:
+                groups.append(current_group)
+                current_group = []
+                current_tokens = 0
+            current_group.append(report)
+            current_tokens += report_tokens
+        if current_group:
+            if len(current_group) == 1 and groups:
+                # Don't leave a lone report to be carried up a level on its own
+                groups[-1].append(current_group[0])
+            else:
+                groups.append(current_group)
+        return groups
+    
+    def consolidate_reports(self, subreports: List[str], use_cli: bool = False) -> str:
+        """Consolidate multiple subreports into a final report with a tree reduce.
         
-        response = client.chat.completions.create(
-            model=GEMINI_MODEL,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": combined_content}
-            ],
-            temperature=0.0
-        )
-        time.sleep(1) # Rate limit to 60 requests/minute
-        return response.choices[0].message.content or ""
+        Subreports are merged in groups that fit the consolidation budget, the groups of a
+        level are merged in parallel, and levels repeat until one report is left. The largest
+        single consolidation call stays bounded however many chunks the project produced.
+        """
+        reports = subreports
+        level = 1
+        while len(reports) > 1:
+            groups = self.group_reports_by_budget(reports, self.args.consolidation_budget)
+            if len(groups) == 1:
+                print(f"\nConsolidating {len(reports)} reports into final report...")
+            else:
+                print(f"\nConsolidation level {level}: merging {len(reports)} reports in {len(groups)} groups...")
+            
+            def merge(group_num: int, group: List[str]) -> str:
+                combined_content = "\n\n---SUBREPORT BOUNDARY---\n\n".join(group)
+                return self.call_gemini(self.get_consolidation_prompt(), combined_content, use_cli,
+                                        f"consolidation level {level} group {group_num}")
+            
+            with ThreadPoolExecutor(max_workers=self.get_map_jobs(), thread_name_prefix="merge") as executor:
+                futures = [executor.submit(merge, g, group) for g, group in enumerate(groups, 1)]
+                try:
+                    reports = [future.result() for future in futures]
+                except BaseException:
+                    self.abort_in_flight()
+                    for future in futures:
+                        future.cancel()
+                    raise
+            level += 1
+        return reports[0]
     
     def select_project_interactive(self, show_costs: bool = True) -> Tuple[str, Path]:
         """Show list of projects and let user select one."""
         if self.args.project_number:
-            # Use project number if provided
-            projects = self.list_all_projects()
+            # Use project number if provided; stats are only computed for the chosen project
+            projects = self.get_project_index()
             if 1 <= self.args.project_number <= len(projects):
-                _, munged_name, project_dir, _, _ = projects[self.args.project_number - 1]
+                _, munged_name, project_dir = projects[self.args.project_number - 1]
                 return (munged_name, project_dir)
             else:
                 raise ValueError(f"Invalid project number: {self.args.project_number}. Must be between 1 and {len(projects)}")
         
-        # Show progress while calculating
+        stale = set()
+        if self.args.fast_estimate:
+            projects = self.list_projects_with_spinner()
+        else:
+            # Stale-while-revalidate: paint from cached stats right away and refresh stale rows live
+            projects, stale = self.list_cached_projects()
+            if stale and self.args.yes:
+                # Nothing will be selected, so there is no point in painting early
+                projects, stale = self.list_projects_with_spinner(), set()
+        
+        if not projects:
+            self.console.print("[red]No Claude projects found in ~/.claude/projects/[/red]")
+            sys.exit(1)
+        
+        pending_choice = None
+        if stale:
+            pending_choice = self.show_projects_while_refreshing(projects, stale, show_costs)
+        else:
+            self.console.print("\n")
+            self.console.print(self.render_project_listing(projects, stale, show_costs))
+        
+        while True:
+            try:
+                if pending_choice is not None:
+                    choice, pending_choice = pending_choice, None
+                else:
+                    if self.args.yes:
+                        self.console.print("[red]Cannot use --yes without --project-number[/red]")
+                        sys.exit(1)
+                    
+                    choice = self.console.input(f"\n{SELECT_PROMPT}")
+                if choice.lower() == 'q':
+                    sys.exit(0)
+                
+                idx = int(choice) - 1
+                if 0 <= idx < len(projects):
+                    _, munged_name, project_dir, _, _ = projects[idx]
+                    return (munged_name, project_dir)
+                else:
+                    self.console.print(f"[red]Please enter a number between 1 and {len(projects)}[/red]")
+            except ValueError:
+                self.console.print("[red]Please enter a valid number[/red]")
+    
+    def list_projects_with_spinner(self) -> List[Tuple[str, str, Path, int, int]]:
+        """Compute the stats of all projects behind a spinner."""
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             console=self.console,
             transient=True
         ) as progress:
-            # Check if cache exists
-            cache_file = Path(self.args.out_dir) / PROJECTS_CACHE_FILE
-            if cache_file.exists():
-                task = progress.add_task("Loading projects (using cache for unchanged projects)...", total=None)
+            if self.args.fast_estimate:
+                progress.add_task("Estimating project token counts from sampled lines...", total=None)
+            elif (Path(self.args.out_dir) / PROJECTS_DB_FILE).exists():
+                progress.add_task("Loading projects (using cache for unchanged projects)...", total=None)
             else:
-                task = progress.add_task("Calculating project sizes and estimating token count...", total=None)
+                progress.add_task("Calculating project sizes and estimating token count...", total=None)
             
             projects = self.list_all_projects()
             progress.stop()
+        return projects
+    
+    def show_projects_while_refreshing(self, projects: List[Tuple[str, str, Path, int, Optional[int]]],
+                                       stale: set, show_costs: bool) -> Optional[str]:
+        """Show the project table live while stale rows are recomputed in the background.
         
-        if not projects:
-            self.console.print("[red]No Claude projects found in ~/.claude/projects/[/red]")
-            sys.exit(1)
+        Rows in projects are updated in place. Returns a selection typed before the refresh
+        finished, or None to prompt as usual.
+        """
+        row_index = {munged_name: i for i, (_, munged_name, _, _, _) in enumerate(projects)}
+        updates: queue.Queue = queue.Queue()
+        cancel = threading.Event()
+        
+        def refresh():
+            try:
+                self.refresh_project_stats([projects[row_index[name]][2] for name in stale],
+                                           lambda name, stats: updates.put((name, stats)), cancel)
+            finally:
+                updates.put(None)
+        
+        refresher = threading.Thread(target=refresh, daemon=True)
+        refresher.start()
         
+        # Typing a selection during the refresh needs stdin polling, which Windows consoles lack
+        can_poll_stdin = os.name != 'nt'
+        choice = None
+        refreshing = True
+        self.console.print("\n")
+        with Live(self.render_project_listing(projects, stale, show_costs, prompt=can_poll_stdin),
+                  console=self.console, auto_refresh=False) as live:
+            while refreshing:
+                if can_poll_stdin:
+                    if select.select([sys.stdin], [], [], 0.1)[0]:
+                        choice = sys.stdin.readline().strip()
+                        break
+                else:
+                    time.sleep(0.1)
+                
+                # Apply finished projects; repaint only when something changed
+                changed = False
+                while True:
+                    try:
+                        update = updates.get_nowait()
+                    except queue.Empty:
+                        break
+                    if update is None:
+                        refreshing = False
+                        continue
+                    name, (size_bytes, token_count) = update
+                    friendly_name, munged_name, project_dir, _, _ = projects[row_index[name]]
+                    projects[row_index[name]] = (friendly_name, munged_name, project_dir, size_bytes, token_count)
+                    stale.discard(name)
+                    changed = True
+                if changed and refreshing:
+                    live.update(self.render_project_listing(projects, stale, show_costs, prompt=can_poll_stdin),
+                                refresh=True)
+            
+            # Final paint without the inline prompt; any further prompt is printed below it
+            live.update(self.render_project_listing(projects, stale, show_costs), refresh=True)
+        
+        if refresher.is_alive():
+            # Skip projects not started yet, and let the ones in progress finish writing their
+            # payload files before the selected project's files are read
+            cancel.set()
+            refresher.join()
+        return choice
+    
+    def render_project_listing(self, projects: List[Tuple[str, str, Path, int, Optional[int]]],
+                               stale: set, show_costs: bool, prompt: bool = False) -> Group:
+        """Build the project table and the notes under it. Stale rows show their cached stats dimmed."""
         # Create rich table with more readable colors
         mode_display = "Rules Analysis (Performance Improvement)" if self.args.mode == "rules" else "Knowledge Extraction"
         table = Table(title=f"Available Claude Projects - {mode_display} Mode", show_lines=True)
@@ -815,11 +2632,13 @@ class ConversationAnalyzer(ABC):
         # Add rows
         for i, (friendly_name, munged_name, _, size_bytes, token_count) in enumerate(projects, 1):
             size_str = self.format_file_size(size_bytes)
-            token_str = self.format_token_count(token_count)
+            token_str = self.format_token_count(token_count) if token_count is not None else "…"
+            cost_str = f"${self.estimate_cost(token_count):.2f}" if token_count is not None else "…"
+            if munged_name in stale:
+                token_str = f"[dim]{token_str} ↻[/dim]"
+                cost_str = f"[dim]{cost_str}[/dim]"
             
             if show_costs:
-                cost = self.estimate_cost(token_count)
-                cost_str = f"${cost:.2f}"
                 table.add_row(
                     str(i),
                     friendly_name,
@@ -835,37 +2654,29 @@ class ConversationAnalyzer(ABC):
                     token_str
                 )
         
-        self.console.print("\n")
-        self.console.print(table)
+        notes = []
+        if stale:
+            notes.append(f"\n[dim]↻ Refreshing {len(stale)} project(s) with changed files; "
+                         f"cached counts shown until then[/dim]")
+        if self.args.fast_estimate:
+            bound = self.token_estimator.error_bound
+            bound_str = f" (±{bound:.0%} at p90 on held-out samples)" if bound is not None else ""
+            notes.append(f"\n[dim]Token counts estimated from sampled lines{bound_str}; "
+                         f"the selected project is counted exactly[/dim]")
         if show_costs:
-            self.console.print(f"\n[dim]Pricing: ${PRICE_PER_M_INPUT:.2f}/M input tokens, ${PRICE_PER_M_OUTPUT:.2f}/M output tokens (max {MAX_OUTPUT_TOKENS:,} output)[/dim]")
+            notes.append(f"\n[dim]Pricing: ${PRICE_PER_M_INPUT:.2f}/M input tokens, ${PRICE_PER_M_OUTPUT:.2f}/M output tokens (max {MAX_OUTPUT_TOKENS:,} output)[/dim]")
         else:
-            self.console.print("\n[dim]Using Gemini CLI with -p flag for free analysis[/dim]")
+            notes.append("\n[dim]Using Gemini CLI with -p flag for free analysis[/dim]")
         
         # Add note about analysis mode
         if self.args.mode == "rules":
-            self.console.print("\n[yellow]Note: Using Rules mode by default. This will analyze conversations to identify[/yellow]")
-            self.console.print("[yellow]assistant failures and generate corrective rules. Use --mode knowledge for[/yellow]")
-            self.console.print("[yellow]traditional project analysis (decisions, mistakes, milestones).[/yellow]")
+            notes.append("\n[yellow]Note: Using Rules mode by default. This will analyze conversations to identify[/yellow]")
+            notes.append("[yellow]assistant failures and generate corrective rules. Use --mode knowledge for[/yellow]")
+            notes.append("[yellow]traditional project analysis (decisions, mistakes, milestones).[/yellow]")
         
-        while True:
-            try:
-                if self.args.yes:
-                    self.console.print("[red]Cannot use --yes without --project-number[/red]")
-                    sys.exit(1)
-                
-                choice = self.console.input("\n[bold]Select a project number (or 'q' to quit):[/bold] ")
-                if choice.lower() == 'q':
-                    sys.exit(0)
-                
-                idx = int(choice) - 1
-                if 0 <= idx < len(projects):
-                    _, munged_name, project_dir, _, _ = projects[idx]
-                    return (munged_name, project_dir)
-                else:
-                    self.console.print(f"[red]Please enter a number between 1 and {len(projects)}[/red]")
-            except ValueError:
-                self.console.print("[red]Please enter a valid number[/red]")
+        if prompt:
+            notes.append(f"\n{SELECT_PROMPT}")
+        return Group(table, *notes)
     
     def run(self):
         """Main execution method."""
@@ -922,7 +2733,10 @@ class ConversationAnalyzer(ABC):
         print(f"\nProject: {self.get_human_friendly_name(munged_path)}")
         print(f"Full path: {project_path}")
         print(f"Looking for files in: {project_dir}")
+        if self.args.fast_estimate:
+            self.print_exact_project_stats(project_dir, show_costs=not use_cli)
         
+        manifest = None
         try:
             # Create output directory if it doesn't exist
             output_dir = Path(self.args.out_dir)
@@ -941,14 +2755,21 @@ class ConversationAnalyzer(ABC):
             last_run_date = self.get_last_run_date(output_path)
             is_differential = last_run_date is not None
             
-            # Read JSONL files (differential or full)
-            content = self.read_jsonl_files(project_dir, since_date=last_run_date)
+            # Stream JSONL files (differential or full) straight into the chunker; the first
+            # chunk is dispatched while the remaining files are still being read
+            chunks = self.prefetch_chunks(
+                self.chunk_content(self.read_jsonl_files(project_dir, since_date=last_run_date)),
+                depth=self.get_map_jobs()
+            )
+            first_chunk = next(chunks, None)
             
-            if is_differential and not content:
-                print("\nNo new conversations since last run. Report is up to date.")
+            if first_chunk is None:
+                if is_differential:
+                    print("\nNo new conversations since last run. Report is up to date.")
+                else:
+                    print("\nNo conversation content found in project.")
                 return
-            
-            print(f"\nTotal content size: {len(content)} characters")
+            chunks = itertools.chain([first_chunk], chunks)
             
             # Check if we need to handle Google credentials
             # This affects both CLI and API usage since expired credentials can interfere with either
@@ -970,155 +2791,59 @@ class ConversationAnalyzer(ABC):
                         existing_report = existing_report[:metadata_start].rstrip()
                 
                 # Analyze new content
-                if len(content) > 1024 * 1024:
-                    # Chunk if needed
-                    chunks = self.chunk_content(content)
-                    print(f"New content split into {len(chunks)} chunks for analysis.")
-                    subreports = []
-                    with tqdm(total=len(chunks), desc="Analyzing new chunks", unit="chunk") as pbar:
-                        for i, chunk in enumerate(chunks, 1):
-                            chunk_size_mb = len(chunk.encode('utf-8')) / (1024 * 1024)
-                            pbar.set_description(f"Analyzing chunk {i}/{len(chunks)} ({chunk_size_mb:.2f}MB)")
-                            
-                            subreport = self.analyze_chunk_with_gemini(chunk, i, len(chunks), use_cli)
-                            subreports.append(subreport)
-                            pbar.update(1)
-                    
+                print("Analyzing new conversations...")
+                subreports = self.analyze_chunks(chunks, use_cli, desc="Analyzing new chunks")
+                if len(subreports) > 1:
                     # Consolidate new content reports
                     new_analysis = self.consolidate_reports(subreports, use_cli)
                 else:
-                    # Single chunk for new content
-                    print("Analyzing new conversations...")
-                    new_analysis = self.analyze_chunk_with_gemini(content, 1, 1, use_cli)
+                    new_analysis = subreports[0]
                 
                 # Consolidate with existing report
                 print("\nMerging with existing report...")
                 
-                if use_cli:
-                    # Use CLI for differential consolidation
-                    combined_content = f"PREVIOUS REPORT:\n\n{existing_report}\n\n---NEW CONVERSATIONS ANALYSIS---\n\n{new_analysis}"
-                    prompt = self.get_differential_consolidation_prompt()
-                    
-                    for attempt in range(MAX_RETRIES):
-                        try:
-                            # Prepare the full prompt content
-                            full_prompt = f"{prompt}\n\n{combined_content}"
-                            
-                            # Build command with flash model to avoid Pro quota issues
-                            cmd = ["gemini", "-m", "gemini-2.5-flash"]
-
-                            # Use the logging wrapper - pass content directly via stdin
-                            result = self.run_gemini_cli_with_logging(cmd, full_prompt, attempt)
-                            
-                            analysis = result.stdout
-                            break # Exit retry loop on success
-                        except subprocess.TimeoutExpired as e:
-                            # Check if it's actually a rate limit disguised as a timeout
-                            stderr_text = ""
-                            if hasattr(e, 'stderr') and e.stderr:
-                                stderr_text = e.stderr.decode('utf-8') if isinstance(e.stderr, bytes) else str(e.stderr)
-                                
-                            is_rate_limit = "429" in stderr_text or "RESOURCE_EXHAUSTED" in stderr_text or "Quota exceeded" in stderr_text
-                            
-                            if is_rate_limit:
-                                print(f"\n[yellow]Gemini CLI hit rate limit (detected in timeout).[/yellow]")
-                                if "Gemini 2.5 Pro" in stderr_text and not self._gemini_model_override_active:
-                                    self._gemini_model_override_active = True
-                                    print(f"[yellow]Switching from Pro to Flash model due to quota limits.[/yellow]")
-                            else:
-                                print(f"\n[yellow]Gemini CLI timed out after {GEMINI_CLI_TIMEOUT} seconds.[/yellow]")
-                            
-                            # Show the command that timed out
-                            print(f"[dim]Command: {' '.join(cmd)}[/dim]")
-                            print(f"[dim]Attempt {attempt + 1}/{MAX_RETRIES}[/dim]")
-                            
-                            # Show partial stderr if available
-                            if stderr_text:
-                                # Extract the most relevant error message
-                                if "message" in stderr_text:
-                                    try:
-                                        import re
-                                        match = re.search(r'"message":\s*"([^"]+)"', stderr_text)
-                                        if match:
-                                            print(f"[red]Error: {match.group(1)}[/red]")
-                                    except:
-                                        pass
-                                else:
-                                    print(f"[dim]Partial error: {stderr_text[:300]}...[/dim]")
-                            
-                            wait_time = INITIAL_BACKOFF_SECONDS * (2 ** attempt)
-                            print(f"\nRetrying in {wait_time:.1f} seconds...")
-                            time.sleep(wait_time)
-                        except subprocess.CalledProcessError as e:
-                            if "429" in e.stderr or "RESOURCE_EXHAUSTED" in e.stderr:
-                                if not self._gemini_model_override_active:
-                                    self._gemini_model_override_active = True
-                                    print("\n[yellow]Rate limit hit. Switching to 'gemini-2.5-flash' model for subsequent calls.[/yellow]")
-                                wait_time = INITIAL_BACKOFF_SECONDS * (2 ** attempt)
-                                print(f"\nGemini CLI rate limit hit (429). Retrying in {wait_time:.1f} seconds... (Attempt {attempt + 1}/{MAX_RETRIES})")
-                                time.sleep(wait_time)
-                            else:
-                                raise RuntimeError(f"Gemini CLI failed: {e.stderr}")
+                combined_content = f"PREVIOUS REPORT:\n\n{existing_report}\n\n---NEW CONVERSATIONS ANALYSIS---\n\n{new_analysis}"
+                analysis = self.call_gemini(self.get_differential_consolidation_prompt(), combined_content,
+                                            use_cli, "differential merge")
+                
+            else:
+                # Full analysis mode
+                print(f"Note: This may take several minutes for large projects.\n")
+                
+                # Checkpoint progress next to the report so an interrupted run can resume
+                manifest = RunManifest(output_path.with_suffix(MANIFEST_SUFFIX), munged_path, self.args.mode)
+                if self.args.resume:
+                    if manifest.load():
+                        print(f"Resuming previous run: {manifest.count('done')} chunks already analyzed.")
                     else:
-                        raise RuntimeError(f"Gemini CLI failed after {MAX_RETRIES} attempts due to rate limiting.")
-                else:
-                    # Use API for differential consolidation
-                    client = self.get_gemini_client()
-                    prompt = self.get_differential_consolidation_prompt()
-                    
-                    combined_content = f"PREVIOUS REPORT:\n\n{existing_report}\n\n---NEW CONVERSATIONS ANALYSIS---\n\n{new_analysis}"
+                        print("No checkpoint found for this project, starting a fresh run.")
+                
+                subreport_files = []  # Track files for cleanup
+                
+                def save_subreport(i: int, subreport: str) -> Path:
+                    if self.args.output:
+                        # Use custom output base name for subreports
+                        base_name = Path(self.args.output).stem
+                        subreport_filename = f"subreport_{base_name}_chunk{i}.md"
+                    else:
+                        prefix = self.get_output_prefix()
+                        subreport_filename = f"subreport_{prefix}_{self.get_human_friendly_name(munged_path).replace(' ', '_').lower()}_chunk{i}.md"
+                    subreport_file = output_dir / subreport_filename
+                    subreport_files.append(subreport_file)  # Track for cleanup
                     
-                    response = client.chat.completions.create(
-                        model=GEMINI_MODEL,
-                        messages=[
-                            {"role": "system", "content": prompt},
-                            {"role": "user", "content": combined_content}
-                        ],
-                        temperature=0.0
-                    )
-                    time.sleep(1) # Rate limit to 60 requests/minute
-                    analysis = response.choices[0].message.content or ""
+                    with open(subreport_file, 'w') as f:
+                        f.write(f"# Subreport {i}: {self.get_human_friendly_name(munged_path)}\n\n")
+                        f.write(subreport)
+                    return subreport_file
                 
-            else:
-                # Full analysis mode (same as before)
-                chunks = self.chunk_content(content)
-                num_chunks = len(chunks)
+                subreports = self.analyze_chunks(chunks, use_cli, on_subreport=save_subreport, manifest=manifest)
+                num_chunks = len(subreports)
                 
                 if num_chunks == 1:
-                    print("Content fits in a single chunk, analyzing directly...")
-                    analysis = self.analyze_chunk_with_gemini(chunks[0], 1, 1, use_cli)
-                    subreports = [analysis]
+                    print("Content fit in a single chunk, no consolidation needed.")
+                    analysis = subreports[0]
                 else:
-                    print(f"\nContent split into {num_chunks} chunks for analysis.")
-                    print(f"Note: This may take several minutes for large projects.\n")
-                    
-                    subreports = []
-                    subreport_files = []  # Track files for cleanup
-                    with tqdm(total=num_chunks, desc="Analyzing chunks", unit="chunk") as pbar:
-                        for i, chunk in enumerate(chunks, 1):
-                            chunk_size_mb = len(chunk.encode('utf-8')) / (1024 * 1024)
-                            pbar.set_description(f"Analyzing chunk {i}/{num_chunks} ({chunk_size_mb:.2f}MB)")
-                            
-                            subreport = self.analyze_chunk_with_gemini(chunk, i, num_chunks, use_cli)
-                            
-                            # Save subreport
-                            if self.args.output:
-                                # Use custom output base name for subreports
-                                base_name = Path(self.args.output).stem
-                                subreport_filename = f"subreport_{base_name}_chunk{i}.md"
-                            else:
-                                prefix = self.get_output_prefix()
-                                subreport_filename = f"subreport_{prefix}_{self.get_human_friendly_name(munged_path).replace(' ', '_').lower()}_chunk{i}.md"
-                            subreport_file = output_dir / subreport_filename
-                            subreport_files.append(subreport_file)  # Track for cleanup
-                            
-                            with open(subreport_file, 'w') as f:
-                                f.write(f"# Subreport {i}/{num_chunks}: {self.get_human_friendly_name(munged_path)}\n\n")
-                                f.write(subreport)
-                            
-                            subreports.append(subreport)
-                            pbar.update(1)
-                    
+                    print(f"\nContent was split into {num_chunks} chunks for analysis.")
                     # Consolidate reports
                     analysis = self.consolidate_reports(subreports, use_cli)
             
@@ -1142,6 +2867,7 @@ class ConversationAnalyzer(ABC):
                 print(f"\nDifferential update completed. Report saved to: {output_file}")
             else:
                 print(f"\nFull analysis completed. Report saved to: {output_file}")
+                manifest.discard()
                 
                 # Clean up subreport files unless --keep-subchunk-reports is specified
                 if 'subreport_files' in locals() and subreport_files and not self.args.keep_subchunk_reports:
@@ -1155,8 +2881,31 @@ class ConversationAnalyzer(ABC):
                 elif 'subreport_files' in locals() and subreport_files and self.args.keep_subchunk_reports:
                     print(f"\nKept {len(subreport_files)} subreport files in {output_dir}/")
             
+            self.print_run_summary()
+            
+        except KeyboardInterrupt:
+            self.abort_in_flight()
+            print("\nInterrupted.")
+            if manifest and manifest.chunks:
+                manifest.save()
+                print(f"Progress saved to {manifest.path}. Run again with --resume to continue.")
+            self.print_run_summary()
+            sys.exit(130)
+        except GeminiCallError as e:
+            print(f"Error: Gemini {e.kind} error: {e}")
+            if isinstance(e, AuthError):
+                print("Check GEMINI_API_KEY, or run 'gemini' once interactively to log in.")
+            elif isinstance(e, QuotaExhaustedError):
+                print("The quota for this model is used up; try again later or switch backend.")
+            if manifest and manifest.chunks:
+                print(f"Progress saved to {manifest.path}. Run again with --resume to continue.")
+            self.print_run_summary()
+            sys.exit(1)
         except Exception as e:
             print(f"Error: {e}")
+            if manifest and manifest.chunks:
+                print(f"Progress saved to {manifest.path}. Run again with --resume to continue.")
+            self.print_run_summary()
             sys.exit(1)
 
 
@@ -1355,6 +3104,30 @@ def main():
                         help="Auto-confirm all prompts")
     parser.add_argument("--keep-subchunk-reports", action="store_true",
                         help="Keep intermediate subchunk report files")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted full analysis, redoing only unfinished chunks")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't reuse or store cached chunk analyses")
+    parser.add_argument("--rpm", type=int,
+                        help="Requests per minute allowed by the rate limiter (0 = unlimited; default depends on backend)")
+    parser.add_argument("--tpm", type=int,
+                        help="Input tokens per minute allowed by the rate limiter (0 = unlimited; default depends on backend)")
+    parser.add_argument("--cli-timeout", type=float, default=GEMINI_CLI_TIMEOUT,
+                        help=f"Kill a gemini CLI call after this many seconds (default: {GEMINI_CLI_TIMEOUT})")
+    parser.add_argument("--cli-stall-timeout", type=float, default=GEMINI_CLI_STALL_TIMEOUT,
+                        help=f"Kill a gemini CLI call that prints nothing for this many seconds (default: {GEMINI_CLI_STALL_TIMEOUT})")
+    parser.add_argument("--consolidation-budget", type=int, default=CONSOLIDATION_TOKEN_BUDGET,
+                        help=f"Max input tokens per consolidation call; more subreports are merged in levels (default: {CONSOLIDATION_TOKEN_BUDGET:,})")
+    parser.add_argument("--profile", choices=sorted(PROJECTION_PROFILES),
+                        help="Fields of each record sent for analysis (default: rules-min in rules mode, knowledge in knowledge mode)")
+    parser.add_argument("--fast-estimate", action="store_true",
+                        help="Estimate project token counts from sampled lines for a near-instant listing")
+    parser.add_argument("--request-tokens", type=int,
+                        help="Token budget per chunk request, including prompt and expected report (default depends on model)")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS,
+                        help=f"Number of chunks to analyze concurrently, as API requests or gemini processes (default: {DEFAULT_JOBS})")
+    parser.add_argument("--ingest-workers", type=int, default=None,
+                        help="Processes filtering session files before analysis (default: one per CPU; 1 = in-process)")
     
     args = parser.parse_args()
     
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compare lines/second of filtering session lines with each installed JSON codec
+(json, orjson, msgspec) and check that they all produce the same payload.
+
+Usage:
+    python pocs/bench_json_codecs.py [FILE.jsonl] [--size-mb 200] [--profile rules-min]
+
+Without a file, a synthetic session file of --size-mb is built by repeating
+pocs/rules/full.jsonl. Install orjson and/or msgspec to include them.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ANALYZER_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_FILE = ANALYZER_DIR / "pocs" / "rules" / "full.jsonl"
+
+sys.path.insert(0, str(ANALYZER_DIR))
+import analyze_claude_history_v2 as analyzer  # noqa: E402
+
+
+def run(file_path: str, profile: str, codec) -> dict:
+    stats = {}
+    digest = hashlib.sha256()
+    lines = 0
+    start = time.time()
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            lines += 1
+            payload = analyzer.filter_jsonl_line(line, profile, stats, codec)
+            if payload is not None:
+                digest.update(payload.encode('utf-8'))
+    return {"lines": lines, "seconds": time.time() - start, "digest": digest.hexdigest(), "stats": stats}
+
+
+def build_sample(size_mb: int) -> str:
+    data = SAMPLE_FILE.read_bytes()
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    with os.fdopen(fd, "wb") as f:
+        written = 0
+        while written < size_mb * 1024 * 1024:
+            f.write(data)
+            written += len(data)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="JSONL session file to filter")
+    parser.add_argument("--size-mb", type=int, default=200, help="Size of the synthetic file if none is given")
+    parser.add_argument("--profile", choices=sorted(analyzer.PROJECTION_PROFILES), default="rules-min")
+    args = parser.parse_args()
+
+    codecs = [codec() for codec in (analyzer.JsonCodec, analyzer.OrjsonCodec, analyzer.MsgspecCodec)
+              if codec.available()]
+    print(f"Codec picked by the analyzer: {analyzer.get_json_codec().name}")
+    file_path = args.file or build_sample(args.size_mb)
+    try:
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"File: {file_path} ({size_mb:.1f}MB), profile {args.profile}")
+        reference = None
+        for codec in codecs:
+            result = run(file_path, args.profile, codec)
+            reference = reference or result
+            same = (result["digest"], result["stats"]) == (reference["digest"], reference["stats"])
+            print(f"{codec.name:>8}: {result['lines'] / result['seconds']:,.0f} lines/s, "
+                  f"{size_mb / result['seconds']:.1f}MB/s ({result['seconds']:.1f}s), "
+                  f"payload {'identical' if same else 'DIFFERS'}, self-check {'passed' if codec.self_check() else 'FAILED'}")
+    finally:
+        if not args.file:
+            os.unlink(file_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare lines/second of filtering session lines with and without the raw-line
+prefilter (type sniffing before json.loads, base64 walk only where needed).
+
+Usage:
+    python pocs/bench_prefilter.py [FILE.jsonl] [--size-mb 1024] [--rounds 2] [--profile rules-min]
+
+Without a file, a synthetic session file of --size-mb is built by repeating
+pocs/rules/full.jsonl, with --extra-share of its lines being the bookkeeping
+records newer Claude Code versions write between messages (file history
+snapshots, progress updates), which no analysis profile but "full" sends.
+Both paths produce the same payload; the benchmark checks that too.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ANALYZER_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_FILE = ANALYZER_DIR / "pocs" / "rules" / "full.jsonl"
+
+sys.path.insert(0, str(ANALYZER_DIR))
+import analyze_claude_history_v2 as analyzer  # noqa: E402
+
+
+def filter_without_prefilter(line: bytes, profile: str, stats) -> str:
+    # What filter_jsonl_line did before: decode every line, walk every kept value
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    filtered_data = analyzer.filter_record(data, profile, stats)
+    return json.dumps(filtered_data, separators=(',', ':'), ensure_ascii=False) if filtered_data else None
+
+
+def run(file_path: str, profile: str, filter_line) -> dict:
+    stats = {}
+    digest = hashlib.sha256()
+    lines = kept = 0
+    start = time.time()
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            lines += 1
+            payload = filter_line(line, profile, stats)
+            if payload is not None:
+                kept += 1
+                digest.update(payload.encode('utf-8'))
+    seconds = time.time() - start
+    return {"lines": lines, "kept": kept, "seconds": seconds, "digest": digest.hexdigest()}
+
+
+def bookkeeping_records(count: int) -> bytes:
+    records = []
+    for i in range(count):
+        if i % 2:
+            record = {"type": "file-history-snapshot", "messageId": f"msg-{i}", "isSnapshotUpdate": False,
+                      "snapshot": {"messageId": f"msg-{i}", "timestamp": "2025-07-11T11:51:40.182Z",
+                                   "trackedFileBackups": {f"src/file{n}.py": {"backupFileName": f"{n:08x}@v{i}",
+                                                                              "version": i} for n in range(20)}}}
+        else:
+            record = {"parentUuid": f"uuid-{i - 1}", "isSidechain": False, "userType": "external",
+                      "cwd": "/Users/julian/expts/demo", "sessionId": "bench", "version": "2.0.0",
+                      "type": "progress", "data": {"type": "hook_progress", "hookEvent": "PostToolUse",
+                                                   "command": "./scripts/lint.sh", "output": "ok\n" * 20},
+                      "uuid": f"uuid-{i}", "timestamp": "2025-07-11T11:51:40.182Z"}
+        records.append(json.dumps(record, separators=(',', ':')).encode() + b"\n")
+    return b"".join(records)
+
+
+def build_sample(size_mb: int, extra_share: float) -> str:
+    lines = [line if line.endswith(b"\n") else line + b"\n"
+             for line in SAMPLE_FILE.read_bytes().splitlines(keepends=True) if line.strip()]
+    extra = round(len(lines) * extra_share / (1 - extra_share))
+    data = b"".join(lines) + bookkeeping_records(extra)
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    with os.fdopen(fd, "wb") as f:
+        written = 0
+        while written < size_mb * 1024 * 1024:
+            f.write(data)
+            written += len(data)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="JSONL session file to filter")
+    parser.add_argument("--size-mb", type=int, default=1024, help="Size of the synthetic file if none is given")
+    parser.add_argument("--extra-share", type=float, default=0.3,
+                        help="Share of bookkeeping records in the synthetic file (default 0.3)")
+    parser.add_argument("--rounds", type=int, default=2, help="Times each path is run; the best is reported")
+    parser.add_argument("--profile", choices=sorted(analyzer.PROJECTION_PROFILES), default="rules-min")
+    args = parser.parse_args()
+
+    file_path = args.file or build_sample(args.size_mb, args.extra_share)
+    try:
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"File: {file_path} ({size_mb:.1f}MB), profile {args.profile}")
+        results = {}
+        # Alternate the paths and keep each one's best round, so drifting machine load hits both alike
+        # Both paths use the json module, so only the prefilter differs (bench_json_codecs.py compares codecs)
+        json_codec = analyzer.JsonCodec()
+        filter_with_prefilter = lambda line, profile, stats: analyzer.filter_jsonl_line(line, profile, stats, json_codec)
+        for _ in range(args.rounds):
+            for name, filter_line in (("before", filter_without_prefilter), ("after", filter_with_prefilter)):
+                result = run(file_path, args.profile, filter_line)
+                if name not in results or result["seconds"] < results[name]["seconds"]:
+                    results[name] = result
+        for name, result in results.items():
+            print(f"{name:>6}: {result['lines'] / result['seconds']:,.0f} lines/s, "
+                  f"{size_mb / result['seconds']:.1f}MB/s ({result['lines']:,} lines, "
+                  f"{result['kept']:,} kept, {result['seconds']:.1f}s)")
+        print(f"Speedup: {results['before']['seconds'] / results['after']['seconds']:.2f}x, payload "
+              f"{'identical' if results['before']['digest'] == results['after']['digest'] else 'DIFFERS'}")
+    finally:
+        if not args.file:
+            os.unlink(file_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare peak memory of counting a session file's tokens in one go (the old
+calculate_project_stats path) against the streaming block tokenizer.
+
+Usage:
+    python pocs/bench_tokenize_memory.py [FILE.jsonl] [--size-mb 200]
+
+Without a file, a synthetic session file of --size-mb is built by repeating
+pocs/rules/full.jsonl. Each path runs in its own subprocess so the peak RSS
+of one can't hide the other.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ANALYZER_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_FILE = ANALYZER_DIR / "pocs" / "rules" / "full.jsonl"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(mode: str, file_path: str):
+    sys.path.insert(0, str(ANALYZER_DIR))
+    import analyze_claude_history_v2 as analyzer
+
+    encoding = analyzer.get_encoding()
+    baseline = peak_rss_mb()
+    start = time.time()
+    if mode == "whole-file":
+        # What calculate_project_stats used to do for each file
+        with open(file_path, 'r') as f:
+            content = f.read()
+            tokens = len(encoding.encode(content)) if encoding else analyzer.estimate_tokens(content)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tokens = analyzer.update_file_payload(file_path, os.path.join(tmp_dir, "payload.jsonl"), "full")['tokens']
+    print(json.dumps({
+        "tokens": tokens,
+        "seconds": time.time() - start,
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "tokenizer": "tiktoken" if encoding else "estimate (encoding unavailable)",
+    }))
+
+
+def build_sample(size_mb: int) -> str:
+    data = SAMPLE_FILE.read_bytes()
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    with os.fdopen(fd, "wb") as f:
+        written = 0
+        while written < size_mb * 1024 * 1024:
+            f.write(data)
+            written += len(data)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="JSONL session file to tokenize")
+    parser.add_argument("--size-mb", type=int, default=200, help="Size of the synthetic file if none is given")
+    parser.add_argument("--child", choices=["whole-file", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.file)
+        return
+
+    file_path = args.file or build_sample(args.size_mb)
+    try:
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        print(f"File: {file_path} ({size_mb:.1f}MB)")
+        for mode in ("whole-file", "streaming"):
+            output = subprocess.run([sys.executable, __file__, file_path, "--child", mode],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>10}: peak RSS {result['peak_mb']:.0f}MB "
+                  f"(+{result['peak_mb'] - result['baseline_mb']:.0f}MB over imports), "
+                  f"{result['tokens']:,} tokens in {result['seconds']:.1f}s [{result['tokenizer']}]")
+        print("Note: streaming counts the filtered payload, whole-file counts the raw JSONL")
+    finally:
+        if not args.file:
+            os.unlink(file_path)
+
+
+if __name__ == "__main__":
+    main()
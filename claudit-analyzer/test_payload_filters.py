@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Check that the ingestion shortcuts give the same payloads as plain json decoding: every
+installed JSON codec, raw-line type sniffing, and the bare base64 check.
+
+Run directly (python test_payload_filters.py) or with pytest. Install orjson and/or
+msgspec to cover them too.
+"""
+
+import base64
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import analyze_claude_history_v2 as analyzer  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parent / "pocs" / "rules" / "full.jsonl"
+
+
+def fixture_lines():
+    return [line for line in FIXTURE.read_bytes().split(b'\n') if line.strip()]
+
+
+def filter_all(lines, profile, codec):
+    stats = {}
+    return [analyzer.filter_jsonl_line(line, profile, stats, codec) for line in lines], stats
+
+
+def test_codecs_match_json():
+    lines = fixture_lines() + analyzer.CODEC_PROBE_LINES
+    codecs = [codec() for codec in (analyzer.OrjsonCodec, analyzer.MsgspecCodec) if codec.available()]
+    print(f"  codecs installed besides json: {', '.join(codec.name for codec in codecs) or 'none'}")
+    for profile in sorted(analyzer.PROJECTION_PROFILES):
+        expected = filter_all(lines, profile, analyzer.JsonCodec())
+        for codec in codecs:
+            assert codec.self_check(), codec.name
+            assert filter_all(lines, profile, codec) == expected, (codec.name, profile)
+
+
+def test_sniffed_type_matches_decoded_type():
+    cases = {
+        b'{"type":"user","message":{"role":"user","content":"hi"}}': "user",
+        # Scalars written after the message
+        b'{"message":{"type":"message","content":[{"type":"text","text":"hi"}]},"type":"assistant"}': "assistant",
+        # Only nested types near either end
+        b'{"parentUuid":null,"message":{"type":"message","role":"user"},"uuid":"u"}': None,
+        # Spaced JSON and escaped values are left to the decoder
+        b'{"type": "user", "message": {}}': None,
+        b'{"type":"us\\u0065r","message":{}}': None,
+        # A quoted "type" inside a string value is escaped, so it can't match the key
+        b'{"summary":"set \\"type\\":\\"x\\" here","type":"summary"}': "summary",
+    }
+    for line, expected in cases.items():
+        assert analyzer.sniff_record_type(line) == expected, line
+    # Whenever the sniff answers, it agrees with the decoded record
+    for line in fixture_lines() + list(cases):
+        sniffed = analyzer.sniff_record_type(line)
+        assert sniffed is None or sniffed == json.loads(line).get('type'), line[:200]
+
+
+def test_base64_shape():
+    data = os.urandom(3000)
+    encoded = base64.b64encode(data).decode()
+    shaped = {
+        "unwrapped": encoded,
+        "MIME, 76 per line": base64.encodebytes(data).decode(),
+        "PEM, 64 per line": "\n".join(encoded[i:i + 64] for i in range(0, len(encoded), 64)),
+        "CRLF": base64.encodebytes(data).decode().replace("\n", "\r\n"),
+        "URL-safe, unpadded": base64.urlsafe_b64encode(os.urandom(3001)).decode().rstrip("="),
+    }
+    not_shaped = {
+        "file listing": "\n".join(f"module_{i}" for i in range(200)),
+        "rule line": "-" * 1200,
+        "hex": "0123456789abcdef" * 100,
+        "lower case and digits": "abc123" * 300,
+        "odd wrapping": "\n".join(encoded[i:i + 80] for i in range(0, len(encoded), 80)),
+        "mixed alphabets": encoded[:600] + "-_" + encoded[600:1198],
+        "impossible length": encoded[:1025],
+    }
+    for name, text in shaped.items():
+        assert analyzer.is_base64_shaped(text), name
+        assert analyzer.strip_base64_images(text).startswith("[BINARY: "), name
+    for name, text in not_shaped.items():
+        assert not analyzer.is_base64_shaped(text), name
+        assert analyzer.strip_base64_images(text) == text, name
+
+
+if __name__ == "__main__":
+    for test in (test_codecs_match_json, test_sniffed_type_matches_decoded_type, test_base64_shape):
+        print(f"{test.__name__}...")
+        test()
+        print("✅ passed")
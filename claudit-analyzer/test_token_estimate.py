@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Check --fast-estimate's sampled token estimates against exact counts on pocs/rules/full.jsonl.
+
+Run directly (python test_token_estimate.py) or with pytest.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import analyze_claude_history_v2 as analyzer  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parent / "pocs" / "rules" / "full.jsonl"
+# A single 64-line sample of one file; the old block sampler was 38% over for rules-min
+MAX_RELATIVE_ERROR = 0.25
+
+
+def exact_tokens(profile: str) -> int:
+    with tempfile.TemporaryDirectory() as out_dir:
+        return analyzer.update_file_payload(str(FIXTURE), os.path.join(out_dir, FIXTURE.name), profile)['tokens']
+
+
+def test_sample_reads_long_lines_whole():
+    # Every line is longer than the blocks the sampler used to read, which dropped them all
+    lines = [b'{"type":"user","n":%d,"text":"%s"}' % (i, b"x" * 40_000) for i in range(20)]
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as f:
+        f.write(b"\n".join(lines) + b"\n")
+        f.flush()
+        sample = analyzer.sample_jsonl_lines(f.name, f.tell())
+    assert sample and all(line in lines for line in sample)
+
+
+def test_estimate_matches_exact_count():
+    size = FIXTURE.stat().st_size
+    lines = analyzer.sample_jsonl_lines(str(FIXTURE), size)
+    for profile in sorted(analyzer.PROJECTION_PROFILES):
+        estimate = analyzer.TokenEstimator(lines, profile).estimate_file(size, lines)
+        exact = exact_tokens(profile)
+        error = estimate / exact - 1
+        print(f"  {profile}: estimate {estimate:,}, exact {exact:,} ({error:+.0%})")
+        assert abs(error) <= MAX_RELATIVE_ERROR, (profile, estimate, exact)
+
+
+if __name__ == "__main__":
+    for test in (test_sample_reads_long_lines_whole, test_estimate_matches_exact_count):
+        print(f"{test.__name__}...")
+        test()
+        print("✅ passed")